@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the image processing functions and the render path.
+
+Times load_image, correct_perspective and the canvas paint, point drag, pan,
+rotation and preview updates of TransFormApp on synthetic images of several
+sizes, with Qt running offscreen, and writes the results as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# Add the src directory to the Python path
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, src_dir)
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.image_utils import load_image, load_image_pyramid, correct_perspective
+
+try:
+    import pillow_heif
+except ImportError:
+    pillow_heif = None
+
+DEFAULT_SIZES = [1, 12, 48, 100]
+
+def synthetic_image(megapixels, seed=0):
+    """Create a 4:3 BGR test image with gradients, shapes and noise."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    
+    # Smooth gradients with some noise compress like a photo rather than a flat fill
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[..., 0] = (x * 0.5 + y * 0.5).astype(np.uint8)
+    image[..., 1] = np.broadcast_to(x, (height, width)).astype(np.uint8)
+    image[..., 2] = np.broadcast_to(y, (height, width)).astype(np.uint8)
+    noise = np.random.default_rng(seed).integers(0, 16, size=(height, width, 1), dtype=np.uint8)
+    image += noise
+    
+    # Draw a document-like quadrilateral
+    quad = sample_points(width, height)
+    cv2.fillPoly(image, [np.int32(quad)], (235, 235, 235))
+    
+    return image
+
+def sample_points(width, height):
+    """Return a slightly skewed quadrilateral inside the image, in clockwise order."""
+    return [
+        [width * 0.12, height * 0.10],
+        [width * 0.88, height * 0.14],
+        [width * 0.85, height * 0.90],
+        [width * 0.10, height * 0.86]
+    ]
+
+def write_image(image, file_path):
+    """Write a BGR test image, using Pillow for HEIC."""
+    if file_path.endswith('.heic'):
+        pillow_heif.register_heif_opener()
+        Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(file_path, quality=90)
+    else:
+        cv2.imwrite(file_path, image)
+
+def time_call(function, repeat):
+    """Call function repeat times and return the durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def summarize(name, megapixels, durations, **extra):
+    """Summarize the durations of one benchmark."""
+    result = {
+        'name': name,
+        'megapixels': megapixels,
+        'repeat': len(durations),
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.mean(durations),
+    }
+    result.update(extra)
+    print(f"{name:<32} {megapixels:>5} MP  median {result['median'] * 1000:9.2f} ms", flush=True)
+    return result
+
+def bench_image_utils(image, megapixels, work_dir, repeat):
+    """Benchmark loading and correcting one image size."""
+    results = []
+    height, width = image.shape[:2]
+    points = sample_points(width, height)
+    
+    formats = ['.jpg', '.png']
+    if pillow_heif is not None:
+        formats.append('.heic')
+    
+    for extension in formats:
+        file_path = os.path.join(work_dir, f"bench_{megapixels}mp{extension}")
+        write_image(image, file_path)
+        results.append(summarize(
+            f"load_image{extension}", megapixels,
+            time_call(lambda: load_image(file_path), repeat),
+            file_size=os.path.getsize(file_path)
+        ))
+    
+    results.append(summarize(
+        "correct_perspective", megapixels,
+        time_call(lambda: correct_perspective(image, points), repeat)
+    ))
+    
+    return results
+
+def bench_render_path(app, image, megapixels, work_dir, repeat):
+    """Benchmark the display and preview updates of the main window."""
+    from ui.main_window import TransFormApp
+    
+    results = []
+    height, width = image.shape[:2]
+    
+    # Load the image into a window without going through the background decode
+    file_path = os.path.join(work_dir, f"bench_{megapixels}mp.png")
+    if not os.path.exists(file_path):
+        cv2.imwrite(file_path, image)
+    window = TransFormApp()
+    window.resize(1280, 800)
+    window.show()
+    app.processEvents()
+    window.on_image_loaded(file_path, load_image_pyramid(file_path), reduced=False)
+    window.points = sample_points(width, height)
+    
+    def paint_cold():
+        window.canvas.tile_cache.clear()
+        window.canvas.repaint()
+    
+    def drag_point():
+        window.points[0][0] += 1
+        window.update_display()
+        app.processEvents()
+    
+    def pan():
+        window.pan_offset_x += 1
+        window.update_display()
+        app.processEvents()
+    
+    def rotate():
+        window.rotate_clockwise()
+        window.canvas.repaint()
+    
+    def update_preview():
+        window.update_preview()
+        while window.preview_runner.running_task is not None:
+            app.processEvents()
+    
+    window.update_display()
+    app.processEvents()
+    results.append(summarize(
+        "paint_canvas (cold)", megapixels, time_call(paint_cold, repeat)
+    ))
+    results.append(summarize(
+        "update_display (drag point)", megapixels, time_call(drag_point, repeat)
+    ))
+    results.append(summarize(
+        "update_display (pan)", megapixels, time_call(pan, repeat)
+    ))
+    results.append(summarize(
+        "rotate_clockwise", megapixels, time_call(rotate, repeat)
+    ))
+    results.append(summarize(
+        "update_preview", megapixels, time_call(update_preview, repeat)
+    ))
+    
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return results
+
+def main(argv=None):
+    """Run the benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark TransForm's hot paths.")
+    parser.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES,
+                        help="image sizes in megapixels (default: 1 12 48 100)")
+    parser.add_argument('--repeat', type=int, default=5, help="repetitions per benchmark")
+    parser.add_argument('--no-gui', action='store_true', help="skip the Qt render path benchmarks")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file to write")
+    args = parser.parse_args(argv)
+    
+    if pillow_heif is None:
+        print("pillow-heif not installed, skipping HEIC", file=sys.stderr)
+    
+    app = None
+    if not args.no_gui:
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv)
+    
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for megapixels in args.sizes:
+            image = synthetic_image(megapixels)
+            results.extend(bench_image_utils(image, megapixels, work_dir, args.repeat))
+            if app is not None:
+                results.extend(bench_render_path(app, image, megapixels, work_dir, args.repeat))
+    
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Check that rotating the view before saving rotates the saved image.
+
+Opens a synthetic document in TransFormApp with Qt running offscreen, places
+the four points, rotates the view and saves through the export queue, the
+same way as the Save Image action. Each result is compared with the
+unrotated result turned by cv2.rotate. Exits with status 1 on a mismatch.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# Add the src directory to the Python path
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, src_dir)
+
+import cv2
+import numpy as np
+from PySide6.QtWidgets import QApplication, QFileDialog
+
+from bench import sample_points, synthetic_image
+
+# The expected result for the view rotations, turned from the unrotated result
+ROTATIONS = {
+    'clockwise': ([True], cv2.ROTATE_90_CLOCKWISE),
+    'counter-clockwise': ([False], cv2.ROTATE_90_COUNTERCLOCKWISE),
+    'half turn': ([True, True], cv2.ROTATE_180),
+}
+
+def process_events(app, condition, timeout=60):
+    """Process Qt events until condition() holds, raising TimeoutError after timeout seconds."""
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            raise TimeoutError("timed out waiting for the application")
+        app.processEvents()
+        time.sleep(0.01)
+
+def save(app, window, file_path):
+    """Save the corrected image through the Save Image action and return it."""
+    QFileDialog.getSaveFileName = staticmethod(lambda *args, **kwargs: (file_path, ''))
+    window.correct_perspective()
+    process_events(app, lambda: not window.export_queue.pending_count())
+    if window.export_queue.failed:
+        raise RuntimeError(f"saving failed: {window.export_queue.failed}")
+    return cv2.imread(file_path)
+
+def main(argv=None):
+    """Save with and without view rotations and compare the results."""
+    parser = argparse.ArgumentParser(description="Check that view rotations rotate the saved image.")
+    parser.add_argument('--megapixels', type=float, default=1, help="size of the test image")
+    args = parser.parse_args(argv)
+    
+    from ui.main_window import TransFormApp
+    
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = TransFormApp()
+    window.show()
+    
+    failed = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        image = synthetic_image(args.megapixels)
+        height, width = image.shape[:2]
+        
+        # Mark the top-left of the document, so every orientation of the result differs
+        cv2.rectangle(image, (int(width * 0.2), int(height * 0.2)), (int(width * 0.35), int(height * 0.4)), (40, 40, 40), -1)
+        input_path = os.path.join(work_dir, 'document.png')
+        cv2.imwrite(input_path, image)
+        
+        def open_document():
+            window.load_image_from_path(input_path)
+            process_events(app, lambda: window.image is not None and not window.image_is_reduced)
+            window.points = [list(point) for point in sample_points(width, height)]
+        
+        open_document()
+        expected = save(app, window, os.path.join(work_dir, 'unrotated.png'))
+        
+        for name, (turns, rotate_code) in ROTATIONS.items():
+            open_document()
+            for clockwise in turns:
+                window.rotate_view(clockwise)
+            result = save(app, window, os.path.join(work_dir, 'rotated.png'))
+            
+            # Pixel centers may shift by up to one pixel, compare the overlapping part
+            target = cv2.rotate(expected, rotate_code)
+            rows, columns = min(result.shape[0], target.shape[0]), min(result.shape[1], target.shape[1])
+            size_ok = abs(result.shape[0] - target.shape[0]) <= 1 and abs(result.shape[1] - target.shape[1]) <= 1
+            difference = np.abs(result[:rows, :columns].astype(np.int16) - target[:rows, :columns]).mean()
+            ok = size_ok and difference < 2
+            failed += not ok
+            print(f"{name}: {'ok' if ok else 'FAILED'}, saved {result.shape[1]}x{result.shape[0]}, "
+                  f"expected {target.shape[1]}x{target.shape[0]}, mean difference {difference:.2f}")
+    
+    window.close()
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
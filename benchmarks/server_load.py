@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Check and load test for the local HTTP service, using only a stdlib client.
+
+Starts the server in this process on a free port, or uses --url, and checks
+that corrections match the pipeline and that bad requests are rejected with
+the right status. Then sends a burst of concurrent requests and reports the
+latency, the 503 count and /metrics. Exits with status 1 if a check failed.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Add the src directory to the Python path
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, src_dir)
+
+import cv2
+import numpy as np
+
+from bench import sample_points, synthetic_image
+from server import make_server
+from utils.pipeline import SourceImage, warp
+
+def post(url, query, data):
+    """POST data to /rectify and return the status, headers and body."""
+    request = urllib.request.Request(f"{url}/rectify?{query}", data=data, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def post_content_length(url, query, value):
+    """POST to /rectify with value as the raw Content-Length header, or none, and return the status."""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    try:
+        connection.putrequest('POST', f"/rectify?{query}")
+        if value is not None:
+            connection.putheader('Content-Length', value)
+        connection.endheaders()
+        return connection.getresponse().status
+    except OSError as e:
+        return repr(e)
+    finally:
+        connection.close()
+
+def points_query(points):
+    """Format points as the points query parameter."""
+    return 'points=' + ','.join(repr(float(value)) for point in points for value in point)
+
+def run_checks(url, image, data):
+    """Send correct and incorrect requests and return the descriptions of the failed checks."""
+    height, width = image.shape[:2]
+    points = sample_points(width, height)
+    failures = []
+    
+    def expect(name, query, status, body=data):
+        got, _, content = post(url, query, body)
+        if got != status:
+            failures.append(f"{name}: expected {status}, got {got} {content[:200]!r}")
+        return content
+    
+    # The corrected PNG matches the pipeline exactly
+    content = expect("points", points_query(points) + '&format=png', 200)
+    if content:
+        served = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        expected = warp(SourceImage(image), points, workers=1).image
+        if served is None or served.shape != expected.shape or np.abs(served.astype(int) - expected).max() > 0:
+            failures.append("points: the result differs from pipeline.warp")
+    
+    rotated = [[height - 1 - y, x] for x, y in points]
+    expect("rotation", points_query(rotated) + '&rotation=1', 200)
+    expect("too few coordinates", 'points=1,2,3', 400)
+    expect("no area", 'points=0,0,1,0,1,0,0,0', 400)
+    expect("outside the image", points_query([[-1e9, 0], [width, 0], [width, height], [0, height]]), 400)
+    expect("not an image", points_query(points), 400, body=b'not an image')
+    expect("unknown format", points_query(points) + '&format=gif', 400)
+    expect("template with rotation", 'template=any&rotation=1', 400)
+    expect("unknown template", 'template=no-such-template', 404)
+    
+    # Malformed lengths are rejected before reading, instead of blocking on the body
+    for value in ('-1', 'abc', None):
+        got = post_content_length(url, points_query(points), value)
+        if got != 400:
+            failures.append(f"Content-Length {value!r}: expected 400, got {got}")
+    return failures
+
+def run_burst(url, query, data, requests, concurrency):
+    """Send requests from concurrency threads at once and return (status, seconds) per request."""
+    def send(_):
+        start = time.perf_counter()
+        status, _, _ = post(url, query, data)
+        return status, time.perf_counter() - start
+    
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(send, range(requests)))
+
+def main(argv=None):
+    """Check the service and measure it under a burst of requests."""
+    parser = argparse.ArgumentParser(description="Check and load test TransForm's HTTP service.")
+    parser.add_argument('--url', help="running server to test (default: start one in this process)")
+    parser.add_argument('--megapixels', type=float, default=12, help="size of the uploaded image")
+    parser.add_argument('--workers', type=int, default=2, help="workers of the in-process server")
+    parser.add_argument('--queue-size', type=int, default=2, help="queue size of the in-process server")
+    parser.add_argument('--requests', type=int, default=16, help="number of requests in the burst")
+    parser.add_argument('--concurrency', type=int, default=8, help="number of concurrent clients in the burst")
+    args = parser.parse_args(argv)
+    
+    server = None
+    url = args.url
+    if url is None:
+        server = make_server(port=0, workers=args.workers, queue_size=args.queue_size)
+        server.RequestHandlerClass.log_message = lambda *_: None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    try:
+        image = synthetic_image(args.megapixels)
+        data = cv2.imencode('.png', image)[1].tobytes()
+        
+        failures = run_checks(url, image, data)
+        for failure in failures:
+            print(f"FAIL {failure}")
+        
+        height, width = image.shape[:2]
+        results = run_burst(url, points_query(sample_points(width, height)), data, args.requests, args.concurrency)
+        served = sorted(seconds for status, seconds in results if status == 200)
+        rejected = sum(status == 503 for status, _ in results)
+        other = len(results) - len(served) - rejected
+        if not served or other:
+            failures.append(f"burst: {len(served)} served, {other} failed")
+        
+        print(f"{len(results)} requests from {args.concurrency} clients: {len(served)} served, "
+              f"{rejected} rejected with 503, {other} failed")
+        if served:
+            print(f"latency of served requests: median {statistics.median(served) * 1000:.0f} ms, "
+                  f"max {served[-1] * 1000:.0f} ms")
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            print(json.dumps(json.load(response), indent=2))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            server.service.shutdown()
+    
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
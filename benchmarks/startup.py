@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the source and the PyInstaller builds.
+
+Launches the application repeatedly with the startup probe enabled, which
+makes it quit as soon as its window is shown, and measures the wall-clock
+time from process launch until then. Exits with status 1 if the median
+exceeds the target.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup targets in seconds, measured from launch until the window is shown
+SOURCE_TARGET = 1.5
+FROZEN_TARGET = 2.5
+
+def measure_startup(command, timeout=60):
+    """Launch command once and return the seconds until the window was shown."""
+    env = dict(os.environ, TRANSFORM_STARTUP_PROBE='1')
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=ROOT_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        for line in process.stdout:
+            if line.strip() == "TRANSFORM_WINDOW_SHOWN":
+                elapsed = time.perf_counter() - start
+                process.wait(timeout=timeout)
+                return elapsed
+        raise RuntimeError(f"{command[0]} exited without showing its window")
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+def main(argv=None):
+    """Measure startup time and compare it with the target."""
+    parser = argparse.ArgumentParser(description="Measure TransForm's startup time.")
+    parser.add_argument('--frozen', metavar='EXECUTABLE',
+                        help="PyInstaller executable to launch, e.g. dist/TransForm.app/Contents/MacOS/TransForm")
+    parser.add_argument('--runs', type=int, default=5, help="number of launches")
+    parser.add_argument('--target', type=float, default=None,
+                        help=f"maximum median startup in seconds (default: {SOURCE_TARGET} for source, "
+                             f"{FROZEN_TARGET} for frozen builds)")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+    
+    if args.frozen:
+        command = [os.path.abspath(args.frozen)]
+        target = args.target or FROZEN_TARGET
+    else:
+        command = [sys.executable, os.path.join(ROOT_DIR, 'run.py')]
+        target = args.target or SOURCE_TARGET
+    
+    # The first launch warms up the file system cache and is not counted
+    measure_startup(command)
+    durations = [measure_startup(command) for _ in range(args.runs)]
+    median = statistics.median(durations)
+    
+    build = 'frozen' if args.frozen else 'source'
+    print(f"{build} startup: median {median:.2f}s, min {min(durations):.2f}s, target {target:.2f}s")
+    
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({
+                'build': build,
+                'command': command,
+                'durations': durations,
+                'median': median,
+                'target': target,
+            }, output_file, indent=2)
+    
+    return 0 if median <= target else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
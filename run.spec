@@ -39,7 +39,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,  # UPX-compressed binaries must be unpacked on every launch
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -54,7 +54,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,  # UPX-compressed binaries must be unpacked on every launch
     upx_exclude=[],
     name='TransForm',
 )
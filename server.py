@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service launcher for the TransForm perspective correction.
+"""
+import os
+import sys
+
+# Add the src directory to the Python path
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+sys.path.insert(0, src_dir)
+
+# Import and run the server
+from src.server import main
+
+if __name__ == "__main__":
+    sys.exit(main())
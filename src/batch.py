@@ -0,0 +1,167 @@
+"""
+Headless batch perspective correction.
+
+Reads a manifest of input images, four corner points each and output paths,
+or applies a quad template to a folder of images, and processes the jobs
+across a process pool without importing PySide6.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from utils.image_utils import IMAGE_EXTENSIONS
+from utils.pipeline import run
+from utils.template_utils import export_template, read_template
+
+CSV_POINT_COLUMNS = ['x1', 'y1', 'x2', 'y2', 'x3', 'y3', 'x4', 'y4']
+
+def read_manifest(manifest_path):
+    """Read batch jobs from a JSON or CSV manifest.
+    
+    JSON manifests contain a list of objects with "input", "points" (four
+    [x, y] pairs in clockwise order), "output" and optionally "rotation" in
+    clockwise quarter turns applied before the points. CSV manifests have the
+    columns input, output, x1, y1, x2, y2, x3, y3, x4, y4. Relative paths
+    are resolved against the directory of the manifest.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    
+    with open(manifest_path, newline='') as manifest_file:
+        if manifest_path.lower().endswith('.csv'):
+            jobs = [
+                {
+                    'input': row['input'],
+                    'output': row['output'],
+                    'points': [
+                        [float(row[x]), float(row[y])]
+                        for x, y in zip(CSV_POINT_COLUMNS[::2], CSV_POINT_COLUMNS[1::2])
+                    ]
+                }
+                for row in csv.DictReader(manifest_file)
+            ]
+        else:
+            jobs = json.load(manifest_file)
+    
+    for job in jobs:
+        job['input'] = os.path.join(base_dir, job['input'])
+        job['output'] = os.path.join(base_dir, job['output'])
+    
+    return jobs
+
+def template_jobs(template, input_dir, output_dir):
+    """Create batch jobs applying a template to every image in input_dir.
+    
+    The outputs keep the input file names, so output_dir must be a different
+    folder. Raises ValueError otherwise.
+    """
+    if os.path.isdir(output_dir) and os.path.samefile(input_dir, output_dir):
+        raise ValueError("--output-dir must differ from --input-dir, the originals would be overwritten")
+    
+    return [
+        {
+            'input': os.path.join(input_dir, file_name),
+            'output': os.path.join(output_dir, file_name),
+            'template': template
+        }
+        for file_name in sorted(os.listdir(input_dir))
+        if file_name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+def init_worker():
+    """Keep each worker process to one OpenCV thread, the pool provides the parallelism."""
+    cv2.setNumThreads(1)
+
+def run_job(job):
+    """Correct the perspective of a single manifest entry and report the outcome."""
+    start = time.perf_counter()
+    result = {'input': job['input'], 'output': job['output'], 'ok': False, 'error': None}
+    
+    try:
+        output_dir = os.path.dirname(job['output'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        # Templates reuse the remap maps cached in the worker process
+        if 'template' in job:
+            export_template(job['input'], job['template'], job['output'])
+        else:
+            run(job['input'], job['points'], job['output'], rotation=job.get('rotation', 0), workers=1)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+def run_batch(jobs, workers=None, on_result=None):
+    """Process the jobs across a process pool and return their results in manifest order."""
+    results = [None] * len(jobs)
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = {pool.submit(run_job, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                # The worker process itself failed, e.g. it ran out of memory
+                results[index] = {
+                    'input': jobs[index]['input'], 'output': jobs[index]['output'],
+                    'ok': False, 'error': str(e), 'seconds': None
+                }
+            if on_result is not None:
+                on_result(results[index])
+    
+    return results
+
+def main(argv=None):
+    """Entry point for the batch command line."""
+    parser = argparse.ArgumentParser(description="Apply free transformations to a batch of images.")
+    parser.add_argument('manifest', nargs='?', help="JSON or CSV manifest of inputs, points and outputs")
+    parser.add_argument('--template',
+                        help="apply this template, by name or as a JSON file, to every image in --input-dir")
+    parser.add_argument('--input-dir', help="folder of images for --template")
+    parser.add_argument('--output-dir', help="folder to write the --template results to")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument('--report', help="write per-job results as JSON to this file")
+    args = parser.parse_args(argv)
+    
+    if args.template:
+        if not args.input_dir or not args.output_dir:
+            parser.error("--template requires --input-dir and --output-dir")
+        try:
+            template = read_template(args.template)
+            jobs = template_jobs(template, args.input_dir, args.output_dir)
+        except (KeyError, ValueError) as e:
+            parser.error(e.args[0])
+    elif args.manifest:
+        jobs = read_manifest(args.manifest)
+    else:
+        parser.error("either a manifest or --template is required")
+    
+    def print_result(result):
+        status = "ok" if result['ok'] else f"error: {result['error']}"
+        print(f"{result['input']} -> {result['output']}: {status}", flush=True)
+    
+    start = time.perf_counter()
+    results = run_batch(jobs, workers=args.workers, on_result=print_result)
+    elapsed = time.perf_counter() - start
+    
+    failed = sum(not result['ok'] for result in results)
+    print(f"Processed {len(results)} images in {elapsed:.1f}s, {failed} failed")
+    
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(results, report_file, indent=2)
+    
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
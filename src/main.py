@@ -1,8 +1,18 @@
+import os
 import sys
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from ui.main_window import TransFormApp
 from utils.icon_utils import set_app_icon
 
+# Set to quit right after the window is shown, for measuring startup time
+STARTUP_PROBE_ENV_VAR = 'TRANSFORM_STARTUP_PROBE'
+
+def report_window_shown(app):
+    """Print a marker for the startup benchmark and quit."""
+    print("TRANSFORM_WINDOW_SHOWN", flush=True)
+    app.quit()
+
 def main():
     """Main entry point for the application."""
     app = QApplication(sys.argv)
@@ -11,6 +21,8 @@ def main():
     set_app_icon()
     window = TransFormApp()
     window.show()
+    if os.environ.get(STARTUP_PROBE_ENV_VAR):
+        QTimer.singleShot(0, lambda: report_window_shown(app))
     return app.exec()
 
 if __name__ == '__main__':
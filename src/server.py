@@ -0,0 +1,310 @@
+"""
+Local HTTP service for the TransForm perspective correction.
+
+Other tools POST an encoded image with four points, or the name of a saved
+template, and receive the corrected image in the response. Corrections run
+in a bounded worker pool; requests beyond its queue are rejected with 503
+and outputs above MAX_OUTPUT_PIXELS with 400, instead of piling up in
+memory. It does not need PySide6.
+
+    POST /rectify?points=x1,y1,x2,y2,x3,y3,x4,y4[&rotation=1][&format=png][&quality=90]
+    POST /rectify?template=copy-stand
+    GET  /metrics
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from utils.errors import InvalidPointsError, LoadError
+from utils.pipeline import EncodeSettings, decode, encode, orient, source_matrix, warp
+from utils.template_utils import load_templates, template_points
+from utils.timing_utils import Timings
+
+DEFAULT_PORT = 8765
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+MAX_OUTPUT_PIXELS = 100 * 1000 * 1000
+
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp',
+    'tif': 'image/tiff', 'tiff': 'image/tiff', 'bmp': 'image/bmp'
+}
+
+class RequestError(Exception):
+    """Raised for a request that cannot be served, carrying the HTTP status to reply with."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class RectifyService:
+    """Run corrections in a bounded worker pool and keep the metrics of the requests."""
+    
+    def __init__(self, workers=4, queue_size=8):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rectify')
+        
+        # Admit at most one request per worker plus queue_size waiting ones
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.running = 0
+        self.responses = {}
+        self.timings = Timings(history=1000)
+    
+    def admit(self):
+        """Reserve a place in the queue, returning False if it is full."""
+        if not self.slots.acquire(blocking=False):
+            return False
+        with self.lock:
+            self.admitted += 1
+        return True
+    
+    def release(self):
+        """Give back a place reserved with admit."""
+        with self.lock:
+            self.admitted -= 1
+        self.slots.release()
+    
+    def run(self, function, *args):
+        """Run a function in the worker pool and wait for its result."""
+        def job():
+            with self.lock:
+                self.running += 1
+            try:
+                return function(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+        
+        return self.pool.submit(job).result()
+    
+    def record(self, status, start):
+        """Record the status and latency of a finished request."""
+        with self.lock:
+            self.responses[int(status)] = self.responses.get(int(status), 0) + 1
+        self.timings.record(f'request {int(status)}', start, time.perf_counter() - start)
+    
+    def metrics(self):
+        """Return the queue depth, response counts and latencies in milliseconds."""
+        with self.lock:
+            metrics = {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'running': self.running,
+                'queued': self.admitted - self.running,
+                'responses': {str(status): count for status, count in sorted(self.responses.items())}
+            }
+        metrics['latency_ms'] = {
+            name: {'latest': round(latest * 1000, 1), 'p95': round(p95 * 1000, 1)}
+            for name, latest, p95 in self.timings.summary()
+        }
+        return metrics
+    
+    def shutdown(self):
+        """Finish the corrections in progress and stop the worker pool."""
+        self.pool.shutdown(wait=True)
+
+def parse_points(value):
+    """Parse eight comma separated coordinates into four [x, y] points."""
+    try:
+        coordinates = [float(number) for number in value.split(',')]
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"points must be numbers, got {value!r}")
+    if len(coordinates) != 8:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"expected 8 coordinates, got {len(coordinates)}")
+    return [coordinates[i:i + 2] for i in range(0, 8, 2)]
+
+def parse_int(query, name, default, low, high):
+    """Return an integer query parameter within [low, high]."""
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}")
+    return value
+
+def check_points(source, points):
+    """Reject points outside the oriented image and outputs larger than MAX_OUTPUT_PIXELS."""
+    width, height = source.size
+    if not all(0 <= x <= width and 0 <= y <= height for x, y in points):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"points must lie within the {width}x{height} image")
+    
+    _, (output_width, output_height) = source_matrix(source, points)
+    if output_width * output_height > MAX_OUTPUT_PIXELS:
+        raise RequestError(
+            HTTPStatus.BAD_REQUEST,
+            f"the {output_width}x{output_height} output exceeds {MAX_OUTPUT_PIXELS} pixels"
+        )
+
+def rectify(data, query):
+    """Correct the perspective of an encoded image as described by the query. Returns the encoded result."""
+    extension = query.get('format', 'jpg').lower()
+    if extension not in CONTENT_TYPES:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"unsupported format {extension!r}")
+    
+    settings = EncodeSettings(
+        jpeg_quality=parse_int(query, 'quality', EncodeSettings.jpeg_quality, 0, 100),
+        png_compression=parse_int(query, 'compression', EncodeSettings.png_compression, 0, 9)
+    )
+    rotation = parse_int(query, 'rotation', 0, 0, 3)
+    source = decode(data)
+    
+    # Templates are saved for the image as stored, points are in pixels of the oriented image
+    if 'template' in query:
+        if rotation:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "templates apply to the unrotated image, omit rotation")
+        templates = load_templates()
+        if query['template'] not in templates:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"unknown template {query['template']!r}")
+        points = template_points(templates[query['template']], *source.size)
+    elif 'points' in query:
+        source = orient(source, rotation)
+        points = parse_points(query['points'])
+    else:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "either points or template is required")
+    
+    check_points(source, points)
+    result = warp(source, points, workers=1)
+    return encode(result, '.' + extension, settings), CONTENT_TYPES[extension], result.size
+
+def error_body(message):
+    """Return the JSON body of an error response."""
+    return json.dumps({'error': message}).encode()
+
+class RectifyHandler(BaseHTTPRequestHandler):
+    """Serve /rectify and /metrics for the RectifyService of the server."""
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        """Report the metrics of the service."""
+        if urlsplit(self.path).path != '/metrics':
+            self.send_error_json(HTTPStatus.NOT_FOUND, "not found")
+            return
+        self.send_body(HTTPStatus.OK, json.dumps(self.server.service.metrics()).encode(), 'application/json')
+    
+    def do_POST(self):
+        """Correct the perspective of the uploaded image."""
+        url = urlsplit(self.path)
+        if url.path != '/rectify':
+            self.discard_body()
+            self.send_error_json(HTTPStatus.NOT_FOUND, "not found")
+            return
+        
+        service = self.server.service
+        start = time.perf_counter()
+        
+        # Reject without decoding the upload when the queue is full
+        if not service.admit():
+            self.discard_body()
+            self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, "queue is full", {'Retry-After': '1'})
+            service.record(HTTPStatus.SERVICE_UNAVAILABLE, start)
+            return
+        
+        status, headers = HTTPStatus.OK, {}
+        try:
+            length = self.content_length()
+            if length > MAX_UPLOAD_BYTES:
+                self.close_connection = True
+                raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"uploads are limited to {MAX_UPLOAD_BYTES} bytes")
+            data = self.rfile.read(length)
+            
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            body, content_type, (width, height) = service.run(rectify, data, query)
+            headers['X-Output-Size'] = f'{width}x{height}'
+        except Exception as e:
+            if isinstance(e, RequestError):
+                status = e.status
+            elif isinstance(e, (LoadError, InvalidPointsError)):
+                status = HTTPStatus.BAD_REQUEST
+            else:
+                status = HTTPStatus.INTERNAL_SERVER_ERROR
+            body, content_type = error_body(str(e)), 'application/json'
+        finally:
+            # Free the place before replying, so a client's next request is admitted
+            service.release()
+        
+        self.send_body(status, body, content_type, headers)
+        service.record(status, start)
+    
+    def content_length(self):
+        """Return the Content-Length of the request.
+        
+        Raises RequestError with 400 if it is missing or not a non-negative
+        integer. The body cannot be read then, so the connection is closed.
+        """
+        value = self.headers.get('Content-Length')
+        try:
+            length = int(value)
+        except (TypeError, ValueError):
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Content-Length must be a non-negative integer, got {value!r}")
+        return length
+    
+    def discard_body(self):
+        """Read and drop the request body in chunks, so clients still receive the reply."""
+        try:
+            length = self.content_length()
+        except RequestError:
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            return
+        while length > 0:
+            chunk = self.rfile.read(min(length, 1024 * 1024))
+            if not chunk:
+                break
+            length -= len(chunk)
+    
+    def send_body(self, status, body, content_type, headers=None):
+        """Send a complete response."""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_error_json(self, status, message, headers=None):
+        """Send an error as a JSON object with an error message."""
+        self.send_body(status, error_body(message), 'application/json', headers)
+
+def make_server(host='127.0.0.1', port=DEFAULT_PORT, workers=4, queue_size=8):
+    """Create the HTTP server with its RectifyService, without starting it."""
+    server = ThreadingHTTPServer((host, port), RectifyHandler)
+    server.daemon_threads = True
+    server.service = RectifyService(workers=workers, queue_size=queue_size)
+    return server
+
+def main(argv=None):
+    """Entry point for the server command line."""
+    parser = argparse.ArgumentParser(description="Serve perspective corrections over HTTP on localhost.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to bind to (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('-j', '--workers', type=int, default=4, help="number of concurrent corrections (default: 4)")
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help="number of requests waiting for a worker before 503 is returned (default: 8)")
+    args = parser.parse_args(argv)
+    
+    server = make_server(args.host, args.port, args.workers, args.queue_size)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+from PySide6.QtCore import QEvent, QRect, Qt, Signal
+from PySide6.QtGui import QColor, QImage, QPainter, QPen, QPixmap, QRegion
+from PySide6.QtWidgets import QWidget
+
+from utils.cache_utils import LRUCache
+from utils.timing_utils import timed
+
+class ImageCanvas(QWidget):
+    """Canvas that paints the visible image tiles with the point handles and quad edges on top.
+    
+    Handles and edges are kept as items, so changing them only repaints their
+    bounding rectangles, and moving the image without zooming scrolls the
+    already painted pixels instead of repainting them.
+    """
+    mousePressed = Signal(object)
+    mouseMoved = Signal(object)
+    mouseReleased = Signal(object)
+    resized = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        
+        self.pyramid = None
+        self.full_size = None
+        self.rotation = 0
+        self.zoom = 1.0
+        self.offset_x = 0
+        self.offset_y = 0
+        self.points = []
+        self.selected_point = None
+        self.overlay_items = set()
+        
+        self.tile_size = 256
+        self.tile_cache = LRUCache(64 * 1024 * 1024, size_of=lambda pixmap: pixmap.width() * pixmap.height() * 4)
+
+    def set_image(self, pyramid, full_size, rotation=0):
+        """Show an image pyramid whose full-resolution size is full_size, rotated by
+        rotation clockwise quarter turns."""
+        if pyramid is self.pyramid and full_size == self.full_size and rotation == self.rotation:
+            return
+        self.pyramid = pyramid
+        self.full_size = full_size
+        self.rotation = rotation
+        self.tile_cache.clear()
+        self.update()
+
+    def set_view(self, zoom, offset_x, offset_y):
+        """Set the zoom and the position of the image origin in the canvas."""
+        if zoom != self.zoom:
+            # A new zoom level changes every pixel
+            self.zoom = zoom
+            self.offset_x = offset_x
+            self.offset_y = offset_y
+            self.overlay_items = self.build_overlay_items()
+            self.update()
+            return
+        
+        dx = offset_x - self.offset_x
+        dy = offset_y - self.offset_y
+        if dx or dy:
+            # Move the painted pixels and only paint the exposed area, keeping
+            # the rounded corners in place
+            self.offset_x = offset_x
+            self.offset_y = offset_y
+            self.overlay_items = self.build_overlay_items()
+            inner = self.rect().adjusted(6, 6, -6, -6)
+            self.scroll(dx, dy, inner)
+            self.update(QRegion(self.rect()) - QRegion(inner))
+
+    def set_points(self, points, selected_point):
+        """Set the points and the selected point, repainting only the items that changed."""
+        self.points = [tuple(point) for point in points]
+        self.selected_point = selected_point
+        
+        # Repaint where items appeared or disappeared
+        items = self.build_overlay_items()
+        dirty = QRegion()
+        for item in items ^ self.overlay_items:
+            dirty += self.item_rect(item)
+        self.overlay_items = items
+        
+        if not dirty.isEmpty():
+            self.update(dirty)
+
+    def to_canvas(self, point):
+        """Convert a point in full-resolution image coordinates to canvas coordinates."""
+        return (
+            self.offset_x + int(point[0] * self.zoom),
+            self.offset_y + int(point[1] * self.zoom)
+        )
+
+    def build_overlay_items(self):
+        """Return the handles and edges to draw, in canvas coordinates."""
+        items = set()
+        radius = int(15 * self.zoom)
+        
+        # Point handles
+        for i, point in enumerate(self.points):
+            x, y = self.to_canvas(point)
+            items.add(('handle', i, x, y, radius, self.selected_point == i))
+        
+        # Lines connecting the 4 points if all 4 points are present
+        if len(self.points) == 4:
+            for i in range(4):
+                x1, y1 = self.to_canvas(self.points[i])
+                x2, y2 = self.to_canvas(self.points[(i + 1) % 4])
+                items.add(('edge', i, x1, y1, x2, y2))
+        
+        return items
+
+    def item_rect(self, item):
+        """Return the rectangle an overlay item paints into."""
+        if item[0] == 'handle':
+            _, i, x, y, radius, _ = item
+            circle = QRect(x - radius, y - radius, radius * 2, radius * 2)
+            label = self.fontMetrics().boundingRect(str(i + 1)).translated(x + radius + 2, y - 5)
+            return circle.united(label).adjusted(-2, -2, 2, 2)
+        
+        _, _, x1, y1, x2, y2 = item
+        return QRect(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1).adjusted(-2, -2, 2, 2)
+
+    def event(self, event):
+        result = super().event(event)
+        
+        # Every pixel is painted, which lets scroll() move pixels instead of
+        # repainting them. Style sheets reset the attribute when polishing.
+        if event.type() in (QEvent.Type.Polish, QEvent.Type.StyleChange):
+            self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        
+        return result
+
+    @timed('paint_canvas')
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        
+        # Draw background with rounded corners over the window color
+        painter.fillRect(event.rect(), QColor(28, 28, 30))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(44, 44, 46))
+        painter.drawRoundedRect(self.rect(), 6, 6)
+        
+        if self.pyramid is None:
+            return
+        
+        # Draw tiles only for the rectangles of the region, not its bounding rectangle
+        for rect in event.region():
+            self.draw_tiles(painter, rect)
+        self.draw_overlay(painter)
+
+    def draw_tiles(self, painter, rect):
+        """Draw the image tiles that intersect the given canvas rectangle."""
+        from utils.image_utils import oriented_size, render_pyramid_region
+        
+        tile_size = self.tile_size
+        view_width, view_height = oriented_size(self.rotation, *self.full_size)
+        scaled_width = int(view_width * self.zoom)
+        scaled_height = int(view_height * self.zoom)
+        
+        # Find the part of the scaled image inside the rectangle
+        left = max(0, rect.left() - self.offset_x)
+        top = max(0, rect.top() - self.offset_y)
+        right = min(scaled_width, rect.right() + 1 - self.offset_x)
+        bottom = min(scaled_height, rect.bottom() + 1 - self.offset_y)
+        if right <= left or bottom <= top:
+            return
+        
+        # Rasterize and draw each tile in the rectangle
+        for row in range(top // tile_size, (bottom - 1) // tile_size + 1):
+            for col in range(left // tile_size, (right - 1) // tile_size + 1):
+                x = col * tile_size
+                y = row * tile_size
+                width = min(tile_size, scaled_width - x)
+                height = min(tile_size, scaled_height - y)
+                
+                # Reuse the tile if it was already rendered at this zoom level
+                tile_key = (self.zoom, col, row)
+                tile_pixmap = self.tile_cache.get(tile_key)
+                if tile_pixmap is None:
+                    tile = render_pyramid_region(
+                        self.pyramid, self.zoom, x, y, width, height, self.full_size, self.rotation
+                    )
+                    image = QImage(tile.data, width, height, tile.strides[0], QImage.Format.Format_BGR888)
+                    tile_pixmap = QPixmap.fromImage(image)
+                    self.tile_cache.put(tile_key, tile_pixmap)
+                
+                painter.drawPixmap(self.offset_x + x, self.offset_y + y, tile_pixmap)
+
+    def draw_overlay(self, painter):
+        """Draw the point handles and the lines connecting them."""
+        painter.setBrush(Qt.GlobalColor.transparent)
+        
+        # Draw points
+        for item in self.overlay_items:
+            if item[0] != 'handle':
+                continue
+            _, i, x, y, radius, selected = item
+            
+            # Red outline for the selected point, white for normal points, 2px wide
+            painter.setPen(QPen(QColor(255, 0, 0) if selected else QColor(255, 255, 255), 2))
+            painter.drawEllipse(x - radius, y - radius, radius * 2, radius * 2)
+            
+            # Draw point number
+            painter.drawText(x + radius + 2, y - 5, str(i + 1))
+        
+        # Draw lines connecting the points - white with 50% transparency
+        painter.setPen(QPen(QColor(255, 255, 255, 50), 2))
+        for item in self.overlay_items:
+            if item[0] == 'edge':
+                _, _, x1, y1, x2, y2 = item
+                painter.drawLine(x1, y1, x2, y2)
+
+    def mousePressEvent(self, event):
+        self.mousePressed.emit(event)
+
+    def mouseMoveEvent(self, event):
+        self.mouseMoved.emit(event)
+
+    def mouseReleaseEvent(self, event):
+        self.mouseReleased.emit(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resized.emit(event)
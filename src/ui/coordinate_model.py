@@ -0,0 +1,40 @@
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+class CoordinateTableModel(QAbstractTableModel):
+    """Key/value rows for the image information table that only signal changed cells."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.rows[index.row()][index.column()]
+        return None
+
+    def set_rows(self, rows):
+        """Replace the rows, notifying views only about the cells that changed."""
+        old_count = len(self.rows)
+        new_count = len(rows)
+        
+        # Update the rows present before and after that changed
+        for row in range(min(old_count, new_count)):
+            if tuple(self.rows[row]) != tuple(rows[row]):
+                self.rows[row] = rows[row]
+                self.dataChanged.emit(self.index(row, 0), self.index(row, 1), [Qt.ItemDataRole.DisplayRole])
+        
+        # Remove or append the remaining rows
+        if new_count < old_count:
+            self.beginRemoveRows(QModelIndex(), new_count, old_count - 1)
+            del self.rows[new_count:]
+            self.endRemoveRows()
+        elif new_count > old_count:
+            self.beginInsertRows(QModelIndex(), old_count, new_count - 1)
+            self.rows.extend(rows[old_count:])
+            self.endInsertRows()
@@ -0,0 +1,54 @@
+from PySide6.QtWidgets import QCheckBox, QDialog, QDialogButtonBox, QFormLayout, QSpinBox
+
+class ExportSettingsDialog(QDialog):
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Settings")
+        
+        # Set dialog style
+        self.setStyleSheet("""
+            QDialog {
+                background-color: rgba(58, 58, 60, 0.8);
+                border-radius: 10px;
+            }
+            QLabel, QCheckBox {
+                color: white;
+            }
+        """)
+        
+        # Create layout
+        layout = QFormLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        
+        # JPEG quality, higher is better and slower to encode
+        self.jpeg_quality = QSpinBox()
+        self.jpeg_quality.setRange(0, 100)
+        self.jpeg_quality.setValue(settings.jpeg_quality)
+        layout.addRow("JPEG quality", self.jpeg_quality)
+        
+        # Progressive JPEG
+        self.progressive = QCheckBox("Progressive JPEG")
+        self.progressive.setChecked(settings.progressive)
+        layout.addRow("", self.progressive)
+        
+        # PNG compression level, higher is smaller and slower to encode
+        self.png_compression = QSpinBox()
+        self.png_compression.setRange(0, 9)
+        self.png_compression.setValue(settings.png_compression)
+        layout.addRow("PNG compression", self.png_compression)
+        
+        # Add OK and Cancel buttons
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def settings(self):
+        """Return the encoder settings chosen in the dialog."""
+        from utils.pipeline import EncodeSettings
+        
+        return EncodeSettings(
+            jpeg_quality=self.jpeg_quality.value(),
+            png_compression=self.png_compression.value(),
+            progressive=self.progressive.isChecked()
+        )
@@ -1,21 +1,26 @@
+import importlib
 import os
-import cv2
-import numpy as np
+import threading
 from PySide6.QtWidgets import (
     QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QFileDialog,
-    QDockWidget, QHBoxLayout, QToolBar, QTableWidget, QTableWidgetItem,
-    QHeaderView, QMenuBar, QMenu, QSizePolicy
+    QDockWidget, QHBoxLayout, QToolBar, QTableView, QAbstractItemView,
+    QHeaderView, QMenuBar, QMenu, QSizePolicy, QMessageBox, QInputDialog
 )
-from PySide6.QtCore import Qt, QSize, QMimeData
+from PySide6.QtCore import Qt, QSize, QMimeData, QTimer
 from PySide6.QtGui import (
-    QImage, QPixmap, QPainter, QColor, QDragEnterEvent, QDropEvent,
-    QAction, QKeySequence, QPen, QPalette, QColor
+    QImage, QPixmap, QDragEnterEvent, QDropEvent,
+    QAction, QKeySequence, QPalette
 )
 
 from .about_dialog import AboutDialog
+from .canvas import ImageCanvas
+from .coordinate_model import CoordinateTableModel
+from .export_settings_dialog import ExportSettingsDialog
+from .workers import BackgroundTasks, ExportQueue, LatestTaskRunner
 from utils.icon_utils import load_icon
-from utils.image_utils import load_image, correct_perspective, rotate_image
 from utils.icon_utils import resource_path
+from utils.cache_utils import LRUCache
+from utils.timing_utils import timed, timings
 
 class TransFormApp(QMainWindow):
     def __init__(self):
@@ -24,6 +29,9 @@ class TransFormApp(QMainWindow):
         self.init_variables()
         self.setup_ui_components()
         self.setup_event_handlers()
+        
+        # Finish loading resources once the window is shown
+        QTimer.singleShot(0, self.load_deferred_resources)
 
     def init_ui(self):
         """Initialize the main UI window."""
@@ -60,6 +68,7 @@ class TransFormApp(QMainWindow):
         """Initialize instance variables."""
         self.image = None
         self.display_image = None
+        self.pyramid = None
         self.points = []
         self.selected_point = None
         self.crosshair_size = 60
@@ -70,6 +79,10 @@ class TransFormApp(QMainWindow):
         self.pos_y = None
         self.orig_width = None 
         self.orig_height = None
+        self.source_size = None
+        self.rotation = 0  # Clockwise quarter turns applied to the view of the image
+        self.corner_index = None
+        self.snap_radius = 12  # Screen pixels
         self.pixmap_width = None
         self.pixmap_height = None
         self.label_width = None
@@ -87,8 +100,17 @@ class TransFormApp(QMainWindow):
         self.pan_start_x = 0
         self.pan_start_y = 0
         self.current_file_path = None
+        self.requested_path = None
+        self.decodes = {}
+        self.session_files = []
+        self.session_index = None
+        self.prefetch_count = 2
+        self.image_cache = LRUCache(2 * 1024 * 1024 * 1024, size_of=self.decoded_image_size)
+        self.image_is_reduced = False
+        self.export_workers = None  # Use all cores
+        self.export_settings = None  # Encoder defaults until changed in the export settings
 
-        # Load icons
+        # Load icons, their images are decoded on first paint
         self.icons = {
             'load': load_icon('folder-open.png'),
             'rotate_ccw': load_icon('undo.png'),
@@ -99,6 +121,12 @@ class TransFormApp(QMainWindow):
             'zoom_out': load_icon('minus.png')
         }
 
+    def decoded_image_size(self, result):
+        """Return the memory held by a cached decode result."""
+        from utils.image_utils import pyramid_nbytes
+        
+        return pyramid_nbytes(result[1])
+
     def setup_ui_components(self):
         """Set up all UI components."""
         self.setup_main_widget()
@@ -123,50 +151,50 @@ class TransFormApp(QMainWindow):
             }
         """)
         
-        self.setup_image_label(layout)
+        self.setup_canvas(layout)
 
-    def setup_image_label(self, layout):
-        """Set up the image display label."""
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.image_label.setMinimumSize(400, 300)
-        self.image_label.setStyleSheet("""
+    def setup_canvas(self, layout):
+        """Set up the canvas that displays the image and the points."""
+        self.canvas = ImageCanvas()
+        self.canvas.setMinimumSize(400, 300)
+        layout.addWidget(self.canvas)
+        
+        # Create welcome container
+        self.setup_welcome_container()
+        
+        # Create loading indicator
+        self.loading_label = QLabel(self.canvas)
+        self.loading_label.setStyleSheet("""
             QLabel {
-                background-color: rgba(44, 44, 46, 0.8);
+                background-color: rgba(28, 28, 30, 0.85);
                 border-radius: 6px;
-                color: white;
-                font-size: 24px;
+                color: gray;
+                font-size: 14px;
                 font-weight: bold;
+                padding: 8px 16px;
             }
         """)
-        layout.addWidget(self.image_label)
-        
-        # Create welcome container
-        self.setup_welcome_container()
-        
-        # Connect resize event
-        self.image_label.resizeEvent = self.on_image_label_resize
+        self.loading_label.hide()
         
-        # Set up mouse tracking
-        self.image_label.setMouseTracking(True)
-        self.image_label.mousePressEvent = self.mouse_press_event
-        self.image_label.mouseMoveEvent = self.mouse_move_event
-        self.image_label.mouseReleaseEvent = self.mouse_release_event
+        # Connect resize and mouse events
+        self.canvas.resized.connect(self.on_canvas_resize)
+        self.canvas.mousePressed.connect(self.mouse_press_event)
+        self.canvas.mouseMoved.connect(self.mouse_move_event)
+        self.canvas.mouseReleased.connect(self.mouse_release_event)
 
     def setup_welcome_container(self):
         """Set up the welcome screen container."""
-        self.welcome_container = QWidget(self.image_label)
+        self.welcome_container = QWidget(self.canvas)
         self.welcome_container.setStyleSheet("background-color: transparent;")
         welcome_layout = QVBoxLayout(self.welcome_container)
         welcome_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         welcome_layout.setSpacing(20)
         
-        # Welcome image
-        welcome_image = QLabel()
-        welcome_image.setPixmap(QPixmap(resource_path('icons/welcome.png')).scaled(
-            80, 80, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
-        welcome_image.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        welcome_layout.addWidget(welcome_image)
+        # Welcome image, loaded once the window is shown
+        self.welcome_image = QLabel()
+        self.welcome_image.setFixedSize(80, 80)
+        self.welcome_image.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        welcome_layout.addWidget(self.welcome_image, alignment=Qt.AlignmentFlag.AlignCenter)
         
         # Welcome text
         welcome_text = QLabel("Drop image here to open")
@@ -183,6 +211,15 @@ class TransFormApp(QMainWindow):
         self.welcome_container.setFixedSize(300, 200)
         self.welcome_container.show()
 
+    def load_deferred_resources(self):
+        """Load resources that are not needed for the first paint of the window."""
+        # Welcome image
+        self.welcome_image.setPixmap(QPixmap(resource_path('icons/welcome.png')).scaled(
+            80, 80, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        
+        # Import the image processing stack in the background
+        self.background_tasks.start(importlib.import_module, 'utils.image_utils')
+
     def setup_menubar(self):
         """Set up the application menu bar."""
         menubar = self.menuBar()
@@ -222,6 +259,19 @@ class TransFormApp(QMainWindow):
         open_action.triggered.connect(self.load_image)
         file_menu.addAction(open_action)
         
+        # Add Previous and Next actions to step through the opened images
+        self.previous_action = QAction("Previous Image", self)
+        self.previous_action.setShortcut(QKeySequence(Qt.KeyboardModifier.ControlModifier | Qt.Key.Key_Left))
+        self.previous_action.triggered.connect(self.show_previous_image)
+        self.previous_action.setEnabled(False)
+        file_menu.addAction(self.previous_action)
+        
+        self.next_action = QAction("Next Image", self)
+        self.next_action.setShortcut(QKeySequence(Qt.KeyboardModifier.ControlModifier | Qt.Key.Key_Right))
+        self.next_action.triggered.connect(self.show_next_image)
+        self.next_action.setEnabled(False)
+        file_menu.addAction(self.next_action)
+        
         # Add separator
         file_menu.addSeparator()
         
@@ -240,6 +290,16 @@ class TransFormApp(QMainWindow):
         self.save_action.setEnabled(False)  # Initially disabled until image loaded with 4 points
         file_menu.addAction(self.save_action)
         
+        # Add Apply Template to Folder action
+        apply_template_action = QAction("Apply Template to Folder...", self)
+        apply_template_action.triggered.connect(self.apply_template_to_folder)
+        file_menu.addAction(apply_template_action)
+        
+        # Add Export Settings action
+        export_settings_action = QAction("Export Settings...", self)
+        export_settings_action.triggered.connect(self.show_export_settings_dialog)
+        file_menu.addAction(export_settings_action)
+        
         # Add separator
         file_menu.addSeparator()
         
@@ -248,6 +308,43 @@ class TransFormApp(QMainWindow):
         quit_action.setShortcut("Q")
         quit_action.triggered.connect(self.close)
         file_menu.addAction(quit_action)
+        
+        # Create Edit menu
+        edit_menu = menubar.addMenu("Edit")
+        
+        # Add Detect Corners action to place the points automatically
+        self.detect_action = QAction("Detect Corners", self)
+        self.detect_action.setShortcut(QKeySequence(Qt.KeyboardModifier.ControlModifier | Qt.Key.Key_D))
+        self.detect_action.triggered.connect(lambda: self.detect_points(replace=True))
+        self.detect_action.setEnabled(False)
+        edit_menu.addAction(self.detect_action)
+        
+        # Add option to detect the corners whenever an image is opened
+        self.auto_detect_action = QAction("Detect Corners on Open", self)
+        self.auto_detect_action.setCheckable(True)
+        self.auto_detect_action.setChecked(True)
+        edit_menu.addAction(self.auto_detect_action)
+        
+        # Add Save Points as Template action for batches with fixed geometry
+        self.save_template_action = QAction("Save Points as Template...", self)
+        self.save_template_action.triggered.connect(self.save_points_as_template)
+        self.save_template_action.setEnabled(False)
+        edit_menu.addAction(self.save_template_action)
+        
+        # Add option to snap points to detected corners, Shift places points freely
+        self.snap_action = QAction("Snap to Corners", self)
+        self.snap_action.setCheckable(True)
+        self.snap_action.setChecked(True)
+        edit_menu.addAction(self.snap_action)
+        
+        # Create View menu
+        view_menu = menubar.addMenu("View")
+        
+        # Add Show Timings action
+        self.timings_action = QAction("Show Timings", self)
+        self.timings_action.setCheckable(True)
+        self.timings_action.toggled.connect(self.toggle_timings)
+        view_menu.addAction(self.timings_action)
 
     def setup_toolbar(self):
         """Set up the application toolbar."""
@@ -296,6 +393,19 @@ class TransFormApp(QMainWindow):
         spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         toolbar.addWidget(spacer)
         
+        # Export status button, shown while exports are queued or after one failed
+        self.export_status_button = QPushButton("")
+        self.export_status_button.setMinimumHeight(30)
+        self.export_status_button.setStyleSheet(button_style)
+        export_menu = QMenu(self.export_status_button)
+        self.cancel_exports_action = export_menu.addAction("Cancel Exports")
+        self.cancel_exports_action.triggered.connect(self.cancel_exports)
+        self.clear_failed_exports_action = export_menu.addAction("Clear Failed Exports")
+        self.clear_failed_exports_action.triggered.connect(self.clear_failed_exports)
+        self.export_status_button.setMenu(export_menu)
+        self.export_status_action = toolbar.addWidget(self.export_status_button)
+        self.export_status_action.setVisible(False)
+        
         # Zoom out button
         self.zoom_out_button = QPushButton("")
         self.zoom_out_button.setIcon(self.icons['zoom_out'])
@@ -414,15 +524,17 @@ class TransFormApp(QMainWindow):
         left_dock_layout.addWidget(info_heading)
         
         # Create table for coordinate display
-        self.coord_table = QTableWidget()
-        self.coord_table.setColumnCount(2)
+        self.coord_model = CoordinateTableModel(self)
+        self.coord_table = QTableView()
+        self.coord_table.setModel(self.coord_model)
+        self.coord_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
         self.coord_table.horizontalHeader().setVisible(False)
         self.coord_table.verticalHeader().setVisible(False)
         self.coord_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
         self.coord_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         self.coord_table.setShowGrid(False)
         self.coord_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: transparent;
                 border: none;
                 border-radius: 6px;
@@ -431,7 +543,7 @@ class TransFormApp(QMainWindow):
                 font-size: 11px;
                 margin-left: 4px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 1px;
             }
         """)
@@ -440,6 +552,9 @@ class TransFormApp(QMainWindow):
         self.coord_table.setContentsMargins(0, 0, 0, 0)
         left_dock_layout.addWidget(self.coord_table)
         
+        # Refresh the table at most once per display frame
+        self.coordinate_timer = self.create_frame_timer(self.refresh_coordinate_table)
+        
         # Add preview heading
         preview_heading = QLabel("Preview")
         preview_heading.setStyleSheet("""
@@ -464,166 +579,160 @@ class TransFormApp(QMainWindow):
         """)
         left_dock_layout.addWidget(self.preview_label)
         
+        # Add timings label, hidden unless enabled in the View menu
+        self.timings_label = QLabel()
+        self.timings_label.setStyleSheet("""
+            QLabel {
+                color: gray;
+                font-family: monospace;
+                font-size: 10px;
+                padding: 5px;
+            }
+        """)
+        self.timings_label.hide()
+        left_dock_layout.addWidget(self.timings_label)
+        
+        # Refresh the timings while they are shown
+        self.timings_timer = QTimer(self)
+        self.timings_timer.setInterval(250)
+        self.timings_timer.timeout.connect(self.update_timings_display)
+        
         # Set left dock widget
         left_dock.setWidget(left_dock_widget)
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, left_dock)
 
+    def create_frame_timer(self, callback):
+        """Create a single-shot timer that calls callback after one display frame."""
+        refresh_rate = self.screen().refreshRate() or 60
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(int(1000 / refresh_rate))
+        timer.timeout.connect(callback)
+        return timer
+
     def setup_event_handlers(self):
         """Set up event handlers for the application."""
-        pass
+        # Render mouse-driven changes at most once per display frame
+        self.display_timer = self.create_frame_timer(self.update_display)
+        
+        # Run image loading and other long operations in the background
+        self.background_tasks = BackgroundTasks(parent=self)
+        
+        # Save images in the background, one after another
+        self.export_queue = ExportQueue(parent=self)
+        self.export_queue.changed.connect(self.update_export_status)
+        
+        # Compute previews in the background, keeping only the latest request
+        self.preview_runner = LatestTaskRunner(parent=self)
+        self.preview_runner.finished.connect(self.on_preview_ready)
 
-    def on_image_label_resize(self, event):
-        """Handle resize events for the image label."""
-        # Center the welcome container in the image label
+    def on_canvas_resize(self, event):
+        """Handle resize events for the canvas."""
+        # Center the welcome container in the canvas
         if hasattr(self, 'welcome_container'):
             self.welcome_container.setGeometry(
-                (self.image_label.width() - self.welcome_container.width()) // 2,
-                (self.image_label.height() - self.welcome_container.height()) // 2,
+                (self.canvas.width() - self.welcome_container.width()) // 2,
+                (self.canvas.height() - self.welcome_container.height()) // 2,
                 self.welcome_container.width(),
                 self.welcome_container.height()
             )
         
+        # Keep the loading indicator centered
+        if hasattr(self, 'loading_label'):
+            self.position_loading_label()
+        
         # Update the image display if an image is loaded
         if self.display_image is not None:
             self.update_display()
-        
-        # Call the original resize event if it exists
-        if hasattr(self.image_label, '_resizeEvent'):
-            self.image_label._resizeEvent(event)
+
+    def toggle_timings(self, visible):
+        """Show or hide the operation timings in the left dock."""
+        self.timings_label.setVisible(visible)
+        if visible:
+            self.update_timings_display()
+            self.timings_timer.start()
+        else:
+            self.timings_timer.stop()
+
+    def update_timings_display(self):
+        """Show the latest and 95th percentile duration of each timed operation."""
+        lines = [f"{'(ms)':<20}{'last':>6}{'p95':>6}"]
+        for name, latest, p95 in timings.summary():
+            lines.append(f"{name[:20]:<20}{latest * 1000:>6.1f}{p95 * 1000:>6.1f}")
+        self.timings_label.setText("\n".join(lines))
+
+    def position_loading_label(self):
+        """Center the loading indicator in the canvas."""
+        self.loading_label.move(
+            (self.canvas.width() - self.loading_label.width()) // 2,
+            (self.canvas.height() - self.loading_label.height()) // 2
+        )
 
     def update_coordinate_display(self):
+        """Schedule an update of the coordinate display, at most once per display frame."""
+        if not self.coordinate_timer.isActive():
+            self.coordinate_timer.start()
+
+    @timed('refresh_coordinate_table')
+    def refresh_coordinate_table(self):
         """Update the coordinate display table with current information."""
         # Create list of rows
         rows = []
         
         # Add scaling information
-        if self.display_image is not None:
-            pixmap = self.image_label.pixmap()
-            if pixmap is not None:
-                rows.append(("Image Size", f"{self.orig_width} x {self.orig_height}"))
-                rows.append(("Display Size", f"{self.scaled_width:.0f} x {self.scaled_height:.0f}"))
-                rows.append(("Zoom", f"{self.zoom_factor * 100:.0f}%"))
-                
-                # Add mouse position if available
-                if self.mouse_x is not None and self.mouse_y is not None:
-                    rows.append(("Mouse", f"{self.mouse_x:.0f}, {self.mouse_y:.0f}"))
-                
-                # Add point coordinates
-                for i, point in enumerate(self.points):
-                    rows.append((f"Point {i+1}", f"{point[0]:.0f}, {point[1]:.0f}"))
-        
-        # Update table
-        self.coord_table.setRowCount(len(rows))
-        for i, (key, value) in enumerate(rows):
-            self.coord_table.setItem(i, 0, QTableWidgetItem(key))
-            self.coord_table.setItem(i, 1, QTableWidgetItem(value))
+        if self.display_image is not None and self.scaled_width is not None:
+            if len(self.session_files) > 1:
+                rows.append(("File", f"{self.session_index + 1} / {len(self.session_files)}"))
+            rows.append(("Image Size", f"{self.orig_width} x {self.orig_height}"))
+            rows.append(("Display Size", f"{self.scaled_width:.0f} x {self.scaled_height:.0f}"))
+            rows.append(("Zoom", f"{self.zoom_factor * 100:.0f}%"))
+            
+            # Add mouse position if available
+            if self.mouse_x is not None and self.mouse_y is not None:
+                rows.append(("Mouse", f"{self.mouse_x:.0f}, {self.mouse_y:.0f}"))
+            
+            # Add point coordinates
+            for i, point in enumerate(self.points):
+                rows.append((f"Point {i+1}", f"{point[0]:.0f}, {point[1]:.0f}"))
+        
+        # Update only the cells that changed
+        self.coord_model.set_rows(rows)
 
+    def schedule_display_update(self):
+        """Mark the display as dirty so it is updated with the next display frame."""
+        if not self.display_timer.isActive():
+            self.display_timer.start()
+
+    @timed('update_display')
     def update_display(self):
         """Update the image display with current zoom and pan settings."""
         if self.display_image is None:
             return
         
         # Get image dimensions
-        self.label_width = self.image_label.width()
-        self.label_height = self.image_label.height()
+        self.label_width = self.canvas.width()
+        self.label_height = self.canvas.height()
         
         # Calculate scaled dimensions based on zoom factor
         self.scaled_width = self.orig_width * self.zoom_factor
         self.scaled_height = self.orig_height * self.zoom_factor
         
-        # Create a larger pixmap for drawing
-        pixmap = QPixmap(int(self.scaled_width), int(self.scaled_height))
-        pixmap.fill(Qt.GlobalColor.transparent)
-        
-        # Create a painter for the pixmap
-        painter = QPainter(pixmap)
-        
-        # Draw the image
-        image = QImage(
-            self.display_image.data,
-            self.display_image.shape[1],
-            self.display_image.shape[0],
-            self.display_image.shape[1] * 3,
-            QImage.Format.Format_RGB888
-        )
-        painter.drawImage(0, 0, image.scaled(
-            int(self.scaled_width),
-            int(self.scaled_height),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        ))
-        
-        # Draw points
-        for i, point in enumerate(self.points):
-            # Calculate scaled point position
-            x = int(point[0] * self.zoom_factor)
-            y = int(point[1] * self.zoom_factor)
-            
-            # Set color based on selection
-            if self.selected_point == i:
-                pen = QPen(QColor(255, 0, 0), 2)  # Red outline for selected point with 2px width
-                painter.setPen(pen)
-                painter.setBrush(Qt.GlobalColor.transparent)
-            else:
-                pen = QPen(QColor(255, 255, 255), 2)  # White outline for normal points with 2px width
-                painter.setPen(pen)
-                painter.setBrush(Qt.GlobalColor.transparent)
-            
-            # Draw circle instead of crosshair
-            circle_radius = int(15 * self.zoom_factor)  # Adjust radius as needed
-            painter.drawEllipse(x - circle_radius, y - circle_radius, 
-                               circle_radius * 2, circle_radius * 2)
-            
-            # Draw point number
-            painter.drawText(x + circle_radius + 2, y - 5, str(i + 1))
-        
-        # Draw lines connecting the 4 points if all 4 points are present
-        if len(self.points) == 4:
-            # Set line color and width - white with 50% transparency
-            pen = QPen(QColor(255, 255, 255, 50), 2)  # White
-            painter.setPen(pen)
-            
-            # Connect the points in sequence (1-2-3-4-1)
-            for i in range(4):
-                # Get current and next point (wrapping around to the first point)
-                current_point = self.points[i]
-                next_point = self.points[(i + 1) % 4]
-                
-                # Calculate scaled positions
-                x1 = int(current_point[0] * self.zoom_factor)
-                y1 = int(current_point[1] * self.zoom_factor)
-                x2 = int(next_point[0] * self.zoom_factor)
-                y2 = int(next_point[1] * self.zoom_factor)
-                
-                # Draw the connecting line
-                painter.drawLine(x1, y1, x2, y2)
-        
-        # End painting
-        painter.end()
-        
         # Calculate the position to center the image in the label
-        offset_x = max(0, (self.label_width - self.scaled_width) // 2)
-        offset_y = max(0, (self.label_height - self.scaled_height) // 2)
+        offset_x = max(0, (self.label_width - int(self.scaled_width)) // 2)
+        offset_y = max(0, (self.label_height - int(self.scaled_height)) // 2)
         
         # Apply pan offset
-        offset_x += self.pan_offset_x
-        offset_y += self.pan_offset_y
+        offset_x += int(self.pan_offset_x)
+        offset_y += int(self.pan_offset_y)
         
         # Store offsets for mouse position calculation
         self.offset_x = offset_x
         self.offset_y = offset_y
         
-        # Create a pixmap for the label with the correct size
-        label_pixmap = QPixmap(self.label_width, self.label_height)
-        label_pixmap.fill(Qt.GlobalColor.transparent)
-        
-        # Draw the image pixmap onto the label pixmap
-        label_painter = QPainter(label_pixmap)
-        label_painter.drawPixmap(offset_x, offset_y, pixmap)
-        label_painter.end()
-        
-        # Set the pixmap to the label
-        self.image_label.setPixmap(label_pixmap)
+        # Hand the view to the canvas, which repaints only what changed
+        self.canvas.set_image(self.pyramid, self.source_size, self.rotation)
+        self.canvas.set_view(self.zoom_factor, offset_x, offset_y)
+        self.canvas.set_points(self.points, self.selected_point)
         
         # Update preview if we have 4 points
         if len(self.points) == 4:
@@ -632,55 +741,45 @@ class TransFormApp(QMainWindow):
         # Update coordinate display
         self.update_coordinate_display()
 
+    @timed('update_preview')
     def update_preview(self):
-        """Update the free transformation preview."""
+        """Request an updated free transformation preview from the background worker."""
+        from utils.image_utils import preview_perspective
+        
         if self.image is None or len(self.points) != 4:
             return
         
-        # Apply free transformation
-        corrected = self.apply_perspective_correction()
-        if corrected is None:
+        # Apply free transformation at the size of the preview label
+        self.preview_runner.submit(
+            preview_perspective,
+            self.pyramid, [list(point) for point in self.points],
+            self.preview_label.width(), self.preview_label.height(),
+            self.source_size, self.rotation
+        )
+
+    def on_preview_ready(self, preview):
+        """Show a free transformation preview computed by the background worker."""
+        if preview is None:
             return
         
-        # No need to convert to RGB as the image is already in RGB format
-        h, w = corrected.shape[:2]
-        bytes_per_line = 3 * w
-        q_img = QImage(corrected.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        
-        # Scale to fit preview label
-        preview_width = self.preview_label.width()
-        preview_height = self.preview_label.height()
-        
-        # Calculate scaling to fit preview area while maintaining aspect ratio
-        scale_w = preview_width / w
-        scale_h = preview_height / h
-        scale = min(scale_w, scale_h)
-        
-        # Create scaled pixmap
-        pixmap = QPixmap.fromImage(q_img).scaled(
-            int(w * scale),
-            int(h * scale),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
+        # Display the BGR preview without converting it
+        h, w = preview.shape[:2]
+        q_img = QImage(preview.data, w, h, preview.strides[0], QImage.Format.Format_BGR888)
+        pixmap = QPixmap.fromImage(q_img)
         
         # Set pixmap to preview label
         self.preview_label.setPixmap(pixmap)
 
-    def apply_perspective_correction(self):
-        """Apply free transformation to the image."""
-        from utils.image_utils import correct_perspective
-        
-        if self.image is None or len(self.points) != 4:
-            return None
-        
-        return correct_perspective(self.image, self.points)
-
     def mouse_press_event(self, event):
         """Handle mouse press events."""
         if self.display_image is None:
             return
         
+        # Apply a pending pan first so the offsets match what is on screen
+        if self.display_timer.isActive():
+            self.display_timer.stop()
+            self.update_display()
+        
         # Calculate image coordinates from mouse position
         mouse_x = event.position().x() - self.offset_x
         mouse_y = event.position().y() - self.offset_y
@@ -712,7 +811,7 @@ class TransFormApp(QMainWindow):
         
         # If no point selected and we have less than 4 points, add a new one
         if self.selected_point is None and len(self.points) < 4:
-            self.points.append([img_x, img_y])
+            self.points.append(list(self.snap_to_corner(img_x, img_y, event.modifiers())))
             self.selected_point = len(self.points) - 1
         
         # Update display
@@ -749,17 +848,17 @@ class TransFormApp(QMainWindow):
             self.pan_start_x = event.position().x()
             self.pan_start_y = event.position().y()
             
-            # Update display
-            self.update_display()
+            # Update display with the next frame
+            self.schedule_display_update()
             return
         
         # Handle point movement
         if self.selected_point is not None:
-            # Update point position
-            self.points[self.selected_point] = [img_x, img_y]
+            # Update point position, snapping it to a nearby corner
+            self.points[self.selected_point] = list(self.snap_to_corner(img_x, img_y, event.modifiers()))
             
-            # Update display
-            self.update_display()
+            # Update display with the next frame
+            self.schedule_display_update()
         else:
             # Just update coordinate display
             self.update_coordinate_display()
@@ -774,8 +873,10 @@ class TransFormApp(QMainWindow):
         self.selected_point = None
         
         # Enable/disable correct button based on number of points
-        self.correct_button.setEnabled(len(self.points) == 4)
-        self.save_action.setEnabled(len(self.points) == 4)
+        can_save = len(self.points) == 4 and not self.image_is_reduced
+        self.correct_button.setEnabled(can_save)
+        self.save_action.setEnabled(can_save)
+        self.save_template_action.setEnabled(len(self.points) == 4)
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         """Handle drag enter events for drag and drop support."""
@@ -784,39 +885,184 @@ class TransFormApp(QMainWindow):
 
     def dropEvent(self, event: QDropEvent):
         """Handle drop events for drag and drop support."""
+        from utils.image_utils import IMAGE_EXTENSIONS
+        
         if event.mimeData().hasUrls():
-            url = event.mimeData().urls()[0]
-            file_path = url.toLocalFile()
-            self.load_image_from_path(file_path)
+            file_paths = [
+                url.toLocalFile() for url in event.mimeData().urls()
+                if url.toLocalFile().lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            if file_paths:
+                self.open_session(file_paths)
 
     def load_image(self):
-        """Open a file dialog to load an image."""
+        """Open a file dialog to load one or more images."""
+        from utils.image_utils import IMAGE_EXTENSIONS
+        
         file_dialog = QFileDialog()
-        file_path, _ = file_dialog.getOpenFileName(
+        file_paths, _ = file_dialog.getOpenFileNames(
             self,
             "Open Image",
             "",
-            "Image Files (*.png *.jpg *.jpeg *.bmp *.heic)"
+            "Image Files ({})".format(" ".join(f"*{extension}" for extension in IMAGE_EXTENSIONS))
         )
         
-        if file_path:
-            self.load_image_from_path(file_path)
+        if file_paths:
+            self.open_session(file_paths)
+
+    def open_session(self, file_paths):
+        """Open the images as a session that can be stepped through."""
+        self.session_files = list(file_paths)
+        self.session_index = 0
+        self.load_image_from_path(self.session_files[0])
+
+    def show_next_image(self):
+        """Show the next image of the session."""
+        if self.session_index is not None and self.session_index + 1 < len(self.session_files):
+            self.session_index += 1
+            self.load_image_from_path(self.session_files[self.session_index])
+
+    def show_previous_image(self):
+        """Show the previous image of the session."""
+        if self.session_index is not None and self.session_index > 0:
+            self.session_index -= 1
+            self.load_image_from_path(self.session_files[self.session_index])
+
+    def update_navigation_actions(self):
+        """Enable the session navigation actions that have an image to go to."""
+        has_session = self.session_index is not None
+        self.previous_action.setEnabled(has_session and self.session_index > 0)
+        self.next_action.setEnabled(has_session and self.session_index + 1 < len(self.session_files))
+
+    def prefetch_paths(self):
+        """Return the session images that should be decoded ahead of time."""
+        if self.session_index is None:
+            return []
+        start = max(0, self.session_index - 1)
+        end = self.session_index + 1 + self.prefetch_count
+        return [
+            file_path for file_path in self.session_files[start:end]
+            if file_path != self.session_files[self.session_index]
+        ]
 
     def load_image_from_path(self, file_path):
-        """Load an image from the specified path."""
-        from utils.image_utils import load_image
+        """Show the image at the specified path, decoding it in the background if needed."""
+        from utils.image_utils import load_image_pyramid
+        
+        self.requested_path = file_path
+        self.update_navigation_actions()
+        
+        # Cancel decodes of images that are no longer needed
+        wanted_paths = set(self.prefetch_paths()) | {file_path}
+        for decoding_path in list(self.decodes):
+            if decoding_path not in wanted_paths:
+                self.decodes.pop(decoding_path).set()
+        
+        # Show a recently used image right away
+        cached = self.image_cache.get(file_path)
+        if cached is not None:
+            self.on_image_loaded(file_path, cached, reduced=False)
+            return
+        
+        # Show loading indicator
+        self.loading_label.setText(f"Loading {os.path.basename(file_path)}...")
+        self.loading_label.adjustSize()
+        self.position_loading_label()
+        self.loading_label.show()
+        self.loading_label.raise_()
+        
+        # Wait for the image if it is already being prefetched
+        if file_path in self.decodes:
+            return
+        
+        # Decode a reduced version for the first paint and the full image off the UI thread
+        self.background_tasks.start(
+            load_image_pyramid, file_path, None, True,
+            finished=lambda result: self.on_reduced_image_decoded(file_path, result)
+        )
+        self.decode_image(file_path)
+
+    def decode_image(self, file_path):
+        """Decode the full-resolution image and its pyramid in the background."""
+        from utils.image_utils import load_image_pyramid
+        
+        cancel_event = threading.Event()
+        self.decodes[file_path] = cancel_event
+        self.background_tasks.start(
+            load_image_pyramid, file_path, cancel_event,
+            finished=lambda result: self.on_image_decoded(file_path, cancel_event, result),
+            failed=lambda error: self.on_image_decoded(file_path, cancel_event, None, error)
+        )
+
+    def prefetch_session_images(self):
+        """Start decoding the session images around the current one."""
+        for file_path in self.prefetch_paths():
+            if file_path not in self.image_cache and file_path not in self.decodes:
+                self.decode_image(file_path)
+
+    def on_reduced_image_decoded(self, file_path, result):
+        """Show a reduced first paint if the full image has not arrived yet."""
+        if result is not None and file_path == self.requested_path:
+            self.on_image_loaded(file_path, result, reduced=True)
+
+    def on_image_decoded(self, file_path, cancel_event, result, error=None):
+        """Cache a full-resolution image decoded in the background and show it, or the error, if requested."""
+        # Ignore decodes that were cancelled in the meantime
+        if cancel_event.is_set():
+            return
+        del self.decodes[file_path]
+        
+        if result is not None:
+            self.image_cache.put(file_path, result)
         
-        # Load image
-        image = load_image(file_path)
-        if image is None:
+        if file_path == self.requested_path:
+            self.on_image_loaded(file_path, result, reduced=False)
+            if error is not None:
+                QMessageBox.warning(self, "Open Image", f"Could not open the image.\n\n{error}")
+
+    def on_image_loaded(self, file_path, result, reduced):
+        """Swap in a decoded image."""
+        # The load is complete once the full-resolution image arrived
+        if not reduced:
+            self.requested_path = None
+            self.prefetch_session_images()
+        
+        # Hide loading indicator
+        self.loading_label.hide()
+        if result is None:
+            return
+        image, pyramid, (width, height) = result
+        
+        # Replace a reduced first paint without touching points or view
+        if self.image_is_reduced and not reduced and file_path == self.current_file_path:
+            self.image = image
+            self.display_image = image
+            self.pyramid = pyramid
+            self.image_is_reduced = False
+            
+            # Enable actions that need the full-resolution image
+            self.correct_button.setEnabled(len(self.points) == 4)
+            self.save_action.setEnabled(len(self.points) == 4)
+            self.save_template_action.setEnabled(len(self.points) == 4)
+            
+            # Find the corners again at full resolution
+            self.detect_snap_corners()
+            
+            # Update display
+            self.update_display()
             return
         
         # Store image
         self.image = image
-        self.display_image = image.copy()
+        self.display_image = image
+        self.pyramid = pyramid
+        self.image_is_reduced = reduced
         
-        # Get image dimensions
-        self.orig_height, self.orig_width = self.image.shape[:2]
+        # Get image dimensions, always in full-resolution coordinates
+        self.source_size = (width, height)
+        self.rotation = 0
+        self.orig_width = width
+        self.orig_height = height
         
         # Reset points and view
         self.reset_points_and_view()
@@ -834,11 +1080,100 @@ class TransFormApp(QMainWindow):
         self.zoom_reset_button.setEnabled(True)
         self.rotate_cw_button.setEnabled(True)
         self.rotate_ccw_button.setEnabled(True)
+        self.detect_action.setEnabled(True)
         self.correct_button.setEnabled(False)
         self.save_action.setEnabled(False)
+        self.save_template_action.setEnabled(False)
         
         # Update display
         self.update_display()
+        
+        # Pre-fill the points with the detected corners
+        if self.auto_detect_action.isChecked():
+            self.detect_points(replace=False)
+        
+        # Find the corners points can snap to
+        self.corner_index = None
+        self.detect_snap_corners()
+
+    def detect_points(self, replace):
+        """Detect the corners of the document in the background and place the points on them.
+        
+        Unless replace is set, the detected corners are only used if no
+        points were placed in the meantime.
+        """
+        from utils.image_utils import detect_quad
+        
+        if self.pyramid is None:
+            return
+        
+        # Detect on the smallest pyramid levels, the reduced first decode is enough
+        file_path = self.current_file_path
+        self.background_tasks.start(
+            detect_quad, self.pyramid, self.source_size,
+            finished=lambda points: self.on_points_detected(file_path, points, replace)
+        )
+
+    def on_points_detected(self, file_path, points, replace):
+        """Place the points on detected corners, in the current orientation of the view."""
+        from utils.image_utils import order_quad_points, orient_points
+        
+        # Ignore results for another image and keep points placed by hand
+        if points is None or file_path != self.current_file_path:
+            return
+        if self.points and not replace:
+            return
+        
+        # Map the corners into the rotated view, starting at its top-left corner
+        self.points = order_quad_points(orient_points(points, self.rotation, *self.source_size))
+        self.selected_point = None
+        
+        # Enable saving once the full-resolution image is loaded
+        can_save = not self.image_is_reduced
+        self.correct_button.setEnabled(can_save)
+        self.save_action.setEnabled(can_save)
+        self.save_template_action.setEnabled(len(self.points) == 4)
+        
+        # Update display
+        self.update_display()
+
+    def detect_snap_corners(self):
+        """Detect corner features in the background for points to snap to."""
+        from utils.image_utils import detect_corners
+        
+        pyramid = self.pyramid
+        self.background_tasks.start(
+            detect_corners, pyramid, self.source_size,
+            finished=lambda corners: self.on_corners_detected(pyramid, corners)
+        )
+
+    def on_corners_detected(self, pyramid, corners):
+        """Index the detected corner features so points can snap to them."""
+        from utils.spatial_utils import GridIndex
+        
+        # Ignore corners found on an image that was replaced in the meantime
+        if pyramid is not self.pyramid:
+            return
+        
+        # Cells of about 1/64 of the image keep lookups to a few cells at any zoom
+        self.corner_index = GridIndex(corners, cell_size=max(self.source_size) / 64)
+
+    def snap_to_corner(self, img_x, img_y, modifiers):
+        """Return the nearest detected corner within the snap radius, or the position itself."""
+        if (self.corner_index is None or not self.snap_action.isChecked()
+                or modifiers & Qt.KeyboardModifier.ShiftModifier):
+            return img_x, img_y
+        
+        from utils.image_utils import orient_points
+        
+        # Look up the position in unrotated image coordinates
+        [[x, y]] = orient_points([[img_x, img_y]], -self.rotation, self.orig_width, self.orig_height)
+        corner = self.corner_index.nearest(x, y, self.snap_radius / self.zoom_factor)
+        if corner is None:
+            return img_x, img_y
+        
+        [[x, y]] = orient_points([corner], self.rotation, *self.source_size)
+        return x, y
 
     def calculate_fit_zoom_factor(self):
         """Calculate zoom factor to fit the image in the window."""
@@ -846,8 +1181,8 @@ class TransFormApp(QMainWindow):
             return 1.0
             
         # Calculate zoom factor to fit image in the window
-        label_width = self.image_label.width()
-        label_height = self.image_label.height()
+        label_width = self.canvas.width()
+        label_height = self.canvas.height()
         
         # Calculate scale factors for width and height
         scale_w = label_width / self.orig_width
@@ -895,40 +1230,41 @@ class TransFormApp(QMainWindow):
 
     def rotate_clockwise(self):
         """Rotate the image clockwise."""
-        if self.display_image is None:
-            return
-        
-        from utils.image_utils import rotate_image
-        
-        # Rotate image
-        self.image = rotate_image(self.image, clockwise=True)
-        self.display_image = self.image.copy()
-        
-        # Update dimensions
-        self.orig_height, self.orig_width = self.image.shape[:2]
-        
-        # Reset points and view
-        self.reset_points_and_view()
-        
-        # Update display
-        self.update_display()
+        self.rotate_view(clockwise=True)
 
     def rotate_counter_clockwise(self):
         """Rotate the image counter-clockwise."""
+        self.rotate_view(clockwise=False)
+
+    def rotate_view(self, clockwise):
+        """Rotate the view of the image by 90 degrees, keeping the points on the same image features.
+        
+        The image itself is not rotated; the rotation is applied when rendering
+        and folded into the perspective matrix when saving.
+        """
         if self.display_image is None:
             return
         
-        from utils.image_utils import rotate_image
+        from utils.image_utils import rotate_points
         
-        # Rotate image
-        self.image = rotate_image(self.image, clockwise=False)
-        self.display_image = self.image.copy()
+        # Move the points along with the image
+        self.points = rotate_points(self.points, self.orig_width, self.orig_height, clockwise)
         
-        # Update dimensions
-        self.orig_height, self.orig_width = self.image.shape[:2]
+        # Renumber a full quad so Point 1 is the top-left corner of the rotated view, which rotates the output
+        if len(self.points) == 4:
+            shift = 1 if clockwise else -1
+            self.points = self.points[-shift:] + self.points[:-shift]
+            if self.selected_point is not None:
+                self.selected_point = (self.selected_point + shift) % 4
         
-        # Reset points and view
-        self.reset_points_and_view()
+        # Update orientation and dimensions
+        self.rotation = (self.rotation + (1 if clockwise else -1)) % 4
+        self.orig_width, self.orig_height = self.orig_height, self.orig_width
+        
+        # Fit the rotated image in the window
+        self.zoom_factor = self.calculate_fit_zoom_factor()
+        self.pan_offset_x = 0
+        self.pan_offset_y = 0
         
         # Update display
         self.update_display()
@@ -939,6 +1275,9 @@ class TransFormApp(QMainWindow):
         self.points = []
         self.selected_point = None
         
+        # Ignore previews still being computed for the old points
+        self.preview_runner.cancel()
+        
         # Reset zoom and pan
         self.zoom_factor = self.calculate_fit_zoom_factor()
         self.pan_offset_x = 0
@@ -947,15 +1286,13 @@ class TransFormApp(QMainWindow):
         # Disable buttons that require points
         self.correct_button.setEnabled(False)
         self.save_action.setEnabled(False)
+        self.save_template_action.setEnabled(False)
 
     def correct_perspective(self):
-        """Apply free transformation and save the result."""
-        if self.image is None or len(self.points) != 4:
-            return
+        """Apply free transformation and queue saving the result."""
+        from utils.pipeline import SourceImage, export
         
-        # Apply free transformation
-        corrected = self.apply_perspective_correction()
-        if corrected is None:
+        if self.image is None or len(self.points) != 4:
             return
         
         # Open save dialog
@@ -967,11 +1304,126 @@ class TransFormApp(QMainWindow):
             "PNG Files (*.png);;JPEG Files (*.jpg *.jpeg)"
         )
         
-        if file_path:
-            # Convert from RGB to BGR for saving with OpenCV
-            corrected_bgr = cv2.cvtColor(corrected, cv2.COLOR_RGB2BGR)
-            # Save image
-            cv2.imwrite(file_path, corrected_bgr)
+        if not file_path:
+            return
+        
+        # Apply free transformation and save image in the background
+        self.export_queue.submit(
+            file_path, export,
+            SourceImage(self.image, self.current_file_path, self.rotation),
+            [list(point) for point in self.points], file_path,
+            settings=self.export_settings, workers=self.export_workers
+        )
+
+    def save_points_as_template(self):
+        """Save the current points as a named template, normalized to the image size."""
+        from utils.image_utils import orient_points
+        from utils.template_utils import save_template
+        
+        if len(self.points) != 4:
+            return
+        
+        name, ok = QInputDialog.getText(self, "Save Template", "Template name:")
+        if not ok or not name:
+            return
+        
+        # Store the points in unrotated image coordinates
+        points = orient_points(self.points, -self.rotation, self.orig_width, self.orig_height)
+        try:
+            save_template(name, points, self.source_size)
+        except OSError as e:
+            print(f"Error saving template {name}: {e}")
+
+    def apply_template_to_folder(self):
+        """Queue applying a saved template to every image in a folder."""
+        from utils.image_utils import IMAGE_EXTENSIONS
+        from utils.template_utils import export_template, load_templates
+        
+        # Choose the template
+        templates = load_templates()
+        if not templates:
+            QMessageBox.information(self, "Apply Template", "Save the points of an image as a template first.")
+            return
+        name, ok = QInputDialog.getItem(self, "Apply Template", "Template:", sorted(templates), 0, False)
+        if not ok:
+            return
+        
+        # Choose the input and output folders
+        input_dir = QFileDialog.getExistingDirectory(self, "Images to Transform")
+        if not input_dir:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, "Save Transformed Images To")
+        if not output_dir:
+            return
+        
+        # The outputs keep the input file names, so they would replace the originals
+        if os.path.samefile(input_dir, output_dir):
+            QMessageBox.warning(self, "Apply Template", "Choose a different folder to save the transformed images to.")
+            return
+        
+        # Queue an export per image, they share the cached remap maps
+        for file_name in sorted(os.listdir(input_dir)):
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            output_path = os.path.join(output_dir, file_name)
+            self.export_queue.submit(
+                output_path, export_template,
+                os.path.join(input_dir, file_name), templates[name], output_path,
+                settings=self.export_settings
+            )
+
+    def update_export_status(self):
+        """Show the number of queued exports and failed exports in the toolbar."""
+        pending = self.export_queue.pending_count()
+        failed = self.export_queue.failed
+        
+        # Describe the queue
+        parts = []
+        if pending:
+            parts.append(f"Saving {pending} ({self.export_queue.progress * 100:.0f}%)")
+        if failed:
+            parts.append(f"{len(failed)} failed")
+        self.export_status_button.setText(" " + ", ".join(parts))
+        
+        # List the failed exports with their errors
+        self.export_status_button.setToolTip("\n".join(
+            f"{os.path.basename(file_path)}: {error}" for file_path, error in failed
+        ))
+        
+        self.cancel_exports_action.setEnabled(bool(pending))
+        self.clear_failed_exports_action.setEnabled(bool(failed))
+        self.export_status_action.setVisible(bool(parts))
+
+    def cancel_exports(self):
+        """Cancel the running export and drop the queued ones."""
+        self.export_queue.cancel_all()
+
+    def clear_failed_exports(self):
+        """Hide the failed exports from the export status."""
+        self.export_queue.clear_failed()
+
+    def show_export_settings_dialog(self):
+        """Show the encoder settings used for saving images."""
+        from utils.pipeline import EncodeSettings
+        
+        dialog = ExportSettingsDialog(self.export_settings or EncodeSettings(), self)
+        if dialog.exec():
+            self.export_settings = dialog.settings()
+
+    def closeEvent(self, event):
+        """Ask before quitting while images are still being saved."""
+        pending = self.export_queue.pending_count()
+        if pending:
+            answer = QMessageBox.question(
+                self, "Quit TransForm",
+                f"{pending} image(s) are still being saved. Quit and cancel saving them?"
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            self.export_queue.cancel_all()
+        
+        super().closeEvent(event)
 
     def show_about_dialog(self):
         """Show the about dialog."""
@@ -0,0 +1,179 @@
+import threading
+from collections import deque
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+class TaskSignals(QObject):
+    """Signals emitted by a background task."""
+    finished = Signal(object)
+    failed = Signal(object)
+    progress = Signal(float)
+
+class Task(QRunnable):
+    """Run a function on a thread pool and report the result through signals."""
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(e)
+            return
+        self.signals.finished.emit(result)
+
+class LatestTaskRunner(QObject):
+    """Run tasks one at a time where each new submission replaces the pending one."""
+    finished = Signal(object)
+    failed = Signal(object)
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.pending = None
+        self.running_task = None
+        self.generation = 0
+
+    def submit(self, function, *args, **kwargs):
+        """Schedule a task, dropping any task still waiting to run."""
+        self.pending = (function, args, kwargs)
+        if self.running_task is None:
+            self._start_pending()
+
+    def cancel(self):
+        """Drop the pending task and ignore the result of the running one."""
+        self.pending = None
+        self.generation += 1
+
+    def _start_pending(self):
+        function, args, kwargs = self.pending
+        self.pending = None
+        
+        # Keep a reference to the task so its signals outlive the worker thread
+        task = Task(function, *args, **kwargs)
+        generation = self.generation
+        task.signals.finished.connect(lambda result: self._on_done(generation, self.finished, result))
+        task.signals.failed.connect(lambda error: self._on_done(generation, self.failed, error))
+        self.running_task = task
+        self.pool.start(task)
+
+    def _on_done(self, generation, signal, value):
+        self.running_task = None
+        
+        # Only report results that were not cancelled in the meantime
+        if generation == self.generation:
+            signal.emit(value)
+        
+        # Start the most recent request that arrived while this one was running
+        if self.pending is not None:
+            self._start_pending()
+
+class BackgroundTasks(QObject):
+    """Start tasks on a thread pool and keep them alive until they report back."""
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.tasks = set()
+
+    def start(self, function, *args, finished=None, failed=None, progress=None, **kwargs):
+        """Run function in the background and call finished or failed with the outcome.
+        
+        If progress is given, function receives a progress keyword argument it
+        can call from the worker thread; the values are passed on to progress
+        on the UI thread.
+        """
+        task = Task(function, *args, **kwargs)
+        task.signals.finished.connect(lambda result: self._on_done(task, finished, result))
+        task.signals.failed.connect(lambda error: self._on_done(task, failed, error))
+        if progress is not None:
+            task.kwargs['progress'] = task.signals.progress.emit
+            task.signals.progress.connect(progress)
+        self.tasks.add(task)
+        self.pool.start(task)
+        return task
+
+    def _on_done(self, task, callback, value):
+        self.tasks.discard(task)
+        if callback is not None:
+            callback(value)
+
+class ExportQueue(QObject):
+    """Run exports one after another in the background and keep the ones that failed.
+    
+    Export functions are called with progress and cancel_event keyword
+    arguments and return a truthy result once the file was written. Their
+    exceptions are kept as the failure message.
+    """
+    changed = Signal()
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.tasks = BackgroundTasks(pool, parent=self)
+        self.pending = deque()
+        self.running = None
+        self.cancel_event = None
+        self.progress = 0.0
+        self.failed = []
+
+    def submit(self, file_path, function, *args, **kwargs):
+        """Queue an export of file_path, starting it right away if no export is running."""
+        self.pending.append((file_path, function, args, kwargs))
+        if self.running is None:
+            self._start_next()
+        self.changed.emit()
+
+    def pending_count(self):
+        """Return the number of queued exports, including the running one."""
+        return len(self.pending) + (self.running is not None)
+
+    def cancel_all(self):
+        """Drop the queued exports and cancel the running one."""
+        self.pending.clear()
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.changed.emit()
+
+    def clear_failed(self):
+        """Forget the exports that failed."""
+        self.failed = []
+        self.changed.emit()
+
+    def _start_next(self):
+        file_path, function, args, kwargs = self.pending.popleft()
+        cancel_event = threading.Event()
+        self.running = file_path
+        self.cancel_event = cancel_event
+        self.progress = 0.0
+        
+        self.tasks.start(
+            function, *args, cancel_event=cancel_event,
+            progress=self._on_progress,
+            finished=lambda written: self._on_done(
+                file_path, cancel_event, None if written else "the file could not be written"
+            ),
+            failed=lambda error: self._on_done(file_path, cancel_event, error),
+            **kwargs
+        )
+
+    def _on_progress(self, fraction):
+        self.progress = fraction
+        self.changed.emit()
+
+    def _on_done(self, file_path, cancel_event, error):
+        self.running = None
+        self.cancel_event = None
+        
+        # Cancelled exports are not failures
+        if error is not None and not cancel_event.is_set():
+            print(f"Error saving image to {file_path}: {error}")
+            self.failed.append((file_path, str(error)))
+        
+        if self.pending:
+            self._start_next()
+        self.changed.emit()
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """A least-recently-used cache bounded by the total size of its values."""
+
+    def __init__(self, max_size, size_of=None):
+        self.max_size = max_size
+        self.size_of = size_of or (lambda value: 1)
+        self.total_size = 0
+        self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used."""
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used items if over budget."""
+        if key in self._items:
+            self.total_size -= self.size_of(self._items.pop(key))
+        self._items[key] = value
+        self.total_size += self.size_of(value)
+        
+        # Evict old items but always keep the newest one
+        while self.total_size > self.max_size and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self.total_size -= self.size_of(evicted)
+
+    def clear(self):
+        """Remove all items from the cache."""
+        self._items.clear()
+        self.total_size = 0
@@ -0,0 +1,14 @@
+class TransformError(Exception):
+    """Base class of the errors raised by the transform pipeline."""
+
+class LoadError(TransformError):
+    """Raised when an image cannot be read or decoded."""
+
+class InvalidPointsError(TransformError, ValueError):
+    """Raised when the points do not describe a quadrilateral with a non-empty output."""
+
+class EncodeError(TransformError):
+    """Raised when an image cannot be encoded or written."""
+
+class ExportCancelled(TransformError):
+    """Raised when a perspective export is cancelled before it finished."""
@@ -1,5 +1,5 @@
 import os
-from PySide6.QtGui import QIcon, QImage, QPixmap
+from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QApplication
 import sys
 
@@ -20,13 +20,9 @@ def set_app_icon():
         app.setWindowIcon(QIcon(app_icon_path))
 
 def load_icon(icon_name):
+    """Return an icon whose image is only read from disk when it is first painted."""
     icon_path = resource_path(f"icons/{icon_name}")
-    icon = QImage(icon_path)
-    if icon.isNull():
+    if not os.path.exists(icon_path):
         return QIcon()
     
-    # Convert to ARGB format if needed
-    if icon.format() != QImage.Format.Format_ARGB32:
-        icon = icon.convertToFormat(QImage.Format.Format_ARGB32)
-    
-    return QIcon(QPixmap.fromImage(icon))
+    return QIcon(icon_path)
@@ -1,34 +1,88 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from PIL import Image
 
-def load_image(file_path):
-    """Load an image from file, handling both regular images and HEIC format."""
-    if file_path.lower().endswith('.heic'):
+from utils.errors import ExportCancelled, LoadError
+from utils.timing_utils import timed
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.heic', '.tif', '.tiff', '.npy')
+
+def open_memmap(file_path):
+    """Open an uncompressed 8-bit color image as a read-only memory-mapped BGR array.
+    
+    Supports raw .npy arrays stored in BGR order and uncompressed, contiguous
+    RGB TIFF files (the latter requires tifffile). Returns None if the file
+    cannot be memory-mapped, for example because it is compressed.
+    """
+    lower_path = file_path.lower()
+    try:
+        if lower_path.endswith('.npy'):
+            image = np.load(file_path, mmap_mode='r')
+        elif lower_path.endswith(('.tif', '.tiff')) and tifffile is not None:
+            image = tifffile.memmap(file_path, mode='r')
+        else:
+            return None
+    except (ValueError, OSError):
+        return None
+    
+    if image.ndim != 3 or image.shape[2] != 3 or image.dtype != np.uint8:
+        return None
+    
+    # TIFF stores RGB, so present the channels reversed without copying
+    if lower_path.endswith(('.tif', '.tiff')):
+        return image[..., ::-1]
+    return image
+
+@timed('load_image')
+def read_image(file_path):
+    """Read an image from file as a BGR array, handling both regular images and HEIC format.
+    
+    Large uncompressed inputs are memory-mapped instead of read into memory.
+    Raises LoadError if the image cannot be read.
+    """
+    image = open_memmap(file_path)
+    if image is not None:
+        return image
+    
+    if file_path.lower().endswith('.npy'):
+        raise LoadError(f"{file_path}: expected an uncompressed height x width x 3 uint8 array")
+    elif file_path.lower().endswith('.heic'):
         try:
             # Open HEIC image with Pillow
             pil_image = Image.open(file_path)
             # Convert to RGB if necessary
             if pil_image.mode != 'RGB':
                 pil_image = pil_image.convert('RGB')
-            # Convert to numpy array
-            return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            # Convert to numpy array and reorder channels in place
+            image = np.array(pil_image)
+            return cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
         except Exception as e:
-            print(f"Error loading HEIC image: {e}")
-            return None
+            raise LoadError(f"{file_path}: {e}") from e
     else:
-        # Handle regular images with OpenCV
+        # Handle regular images with OpenCV, keeping its native BGR order
         image = cv2.imread(file_path)
-        if image is not None:
-            # Convert from BGR to RGB for display
-            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        return None
+        if image is None:
+            raise LoadError(f"{file_path}: cannot be read or decoded")
+        return image
 
-def correct_perspective(image, points):
-    """Apply free transformation to the image using the given points."""
-    if len(points) != 4:
+def load_image(file_path):
+    """Load an image from file as a BGR array, printing the error and returning None if it fails."""
+    try:
+        return read_image(file_path)
+    except LoadError as e:
+        print(f"Error loading image {e}")
         return None
-        
+
+def perspective_transform(points):
+    """Calculate the perspective matrix and output size that map the points to a rectangle."""
     # Define source points (in clockwise order)
     src_points = np.float32(points)
     
@@ -54,11 +108,488 @@ def correct_perspective(image, points):
     # Calculate perspective transform matrix
     matrix = cv2.getPerspectiveTransform(src_points, dst_points)
     
+    return matrix, (int(width), int(height))
+
+def orientation_matrix(rotation, width, height):
+    """Return the 3x3 matrix mapping pixels of a width x height image to the image
+    rotated by the given number of clockwise quarter turns, matching cv2.rotate."""
+    rotation %= 4
+    if rotation == 1:
+        matrix = [[0, -1, height - 1], [1, 0, 0], [0, 0, 1]]
+    elif rotation == 2:
+        matrix = [[-1, 0, width - 1], [0, -1, height - 1], [0, 0, 1]]
+    elif rotation == 3:
+        matrix = [[0, 1, 0], [-1, 0, width - 1], [0, 0, 1]]
+    else:
+        matrix = np.eye(3)
+    return np.array(matrix, dtype=np.float64)
+
+def oriented_size(rotation, width, height):
+    """Return the (width, height) of a width x height image after the given clockwise quarter turns."""
+    if rotation % 2:
+        return height, width
+    return width, height
+
+def orient_points(points, rotation, width, height):
+    """Map points of a width x height image into the image rotated by rotation clockwise quarter turns."""
+    if len(points) == 0:
+        return []
+    matrix = orientation_matrix(rotation, width, height)
+    return (np.float64(points) @ matrix[:2, :2].T + matrix[:2, 2]).tolist()
+
+def rotate_points(points, width, height, clockwise=True):
+    """Move points of a width x height image along with a 90 degree rotation of the image."""
+    return orient_points(points, 1 if clockwise else 3, width, height)
+
+def point_bounds(points, width, height, margin=1):
+    """Return the padded bounding box (x0, y0, x1, y1) of the points, clipped to the image."""
+    points = np.asarray(points, dtype=np.float64)
+    x0 = max(0, int(np.floor(points[:, 0].min())) - margin)
+    y0 = max(0, int(np.floor(points[:, 1].min())) - margin)
+    x1 = min(width, int(np.ceil(points[:, 0].max())) + margin)
+    y1 = min(height, int(np.ceil(points[:, 1].max())) + margin)
+    return x0, y0, x1, y1
+
+def warp_perspective_tiled(image, matrix, size, tile_size=1024, workers=None,
+                           progress=None, cancel_event=None, out=None):
+    """Warp the image into an output buffer tile by tile across a thread pool.
+    
+    Each tile only reads the part of the source it samples from, so memory
+    stays bounded by the output buffer, which may be preallocated (for
+    example memory-mapped) and passed as out. progress is called with the
+    finished fraction from worker threads. Raises ExportCancelled if
+    cancel_event is set before all tiles were warped.
+    """
+    width, height = size
+    if out is None:
+        out = np.zeros((height, width) + image.shape[2:], dtype=image.dtype)
+    inverse = np.linalg.inv(matrix)
+    
+    tiles = [
+        (x, y, min(tile_size, width - x), min(tile_size, height - y))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+    finished = []
+    lock = threading.Lock()
+    
+    def warp_tile(x, y, tile_width, tile_height):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        
+        # Find the part of the source this tile samples from
+        corners = np.float64([
+            [[x, y]], [[x + tile_width, y]],
+            [[x, y + tile_height]], [[x + tile_width, y + tile_height]]
+        ])
+        src_corners = cv2.perspectiveTransform(corners, inverse).reshape(-1, 2)
+        x0, y0, x1, y1 = point_bounds(src_corners, image.shape[1], image.shape[0], margin=2)
+        
+        # Warp the cropped source straight into the output buffer
+        if x1 > x0 and y1 > y0:
+            tile_matrix = np.array([
+                [1, 0, -x],
+                [0, 1, -y],
+                [0, 0, 1]
+            ], dtype=np.float64) @ matrix @ np.array([
+                [1, 0, x0],
+                [0, 1, y0],
+                [0, 0, 1]
+            ], dtype=np.float64)
+            cv2.warpPerspective(
+                image[y0:y1, x0:x1], tile_matrix, (tile_width, tile_height),
+                dst=out[y:y + tile_height, x:x + tile_width]
+            )
+        
+        # Report progress
+        if progress is not None:
+            with lock:
+                finished.append((x, y))
+                fraction = len(finished) / len(tiles)
+            progress(fraction)
+    
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for future in [pool.submit(warp_tile, *tile) for tile in tiles]:
+            future.result()
+    
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExportCancelled("Export cancelled")
+    
+    return out
+
+def correct_perspective(image, points, workers=None, progress=None, cancel_event=None, out=None, rotation=0):
+    """Apply free transformation to the image using the given points.
+    
+    The points are given in the image rotated by rotation clockwise quarter
+    turns; the rotation is folded into the perspective matrix instead of
+    rotating the image.
+    """
+    if len(points) != 4:
+        return None
+    
+    matrix, size = perspective_transform(points)
+    if size[0] < 1 or size[1] < 1:
+        return None
+    matrix = matrix @ orientation_matrix(rotation, image.shape[1], image.shape[0])
+    
     # Apply perspective transform
-    return cv2.warpPerspective(image, matrix, (int(width), int(height)))
+    return warp_perspective_tiled(
+        image, matrix, size, workers=workers,
+        progress=progress, cancel_event=cancel_event, out=out
+    )
+
+def encode_params(file_path, jpeg_quality=95, png_compression=1, progressive=False):
+    """Return the cv2.imwrite parameters for the format of file_path.
+    
+    The defaults match OpenCV's own. Lower PNG compression levels encode
+    faster at the cost of larger files.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in ('.jpg', '.jpeg'):
+        return [
+            cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality),
+            cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)
+        ]
+    if extension == '.png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+    return []
 
-def rotate_image(image, clockwise=True):
-    """Rotate the image 90 degrees in the specified direction."""
-    if clockwise:
-        return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
-    return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+@timed('preview_perspective')
+def preview_perspective(pyramid, points, max_width, max_height, full_size=None, rotation=0):
+    """Apply free transformation at preview size, sampling from a downscaled pyramid level.
+    
+    The points are given in the image rotated by rotation clockwise quarter turns.
+    """
+    if len(points) != 4:
+        return None
+    
+    matrix, (width, height) = perspective_transform(points)
+    if width < 1 or height < 1:
+        return None
+    
+    # Calculate the preview size while maintaining aspect ratio
+    scale = min(max_width / width, max_height / height)
+    preview_width = max(1, int(width * scale))
+    preview_height = max(1, int(height * scale))
+    
+    # Sample from the smallest level that still has enough resolution
+    level = select_pyramid_level(pyramid, scale, full_size)
+    level_scale_x, level_scale_y = pyramid_level_scale(pyramid, level, full_size)
+    
+    # Crop the level to the selected quadrilateral, in unrotated coordinates
+    full_width, full_height = full_size or (pyramid[0].shape[1], pyramid[0].shape[0])
+    orientation = orientation_matrix(rotation, full_width, full_height)
+    source_points = cv2.perspectiveTransform(np.float64([points]), np.linalg.inv(orientation))[0]
+    level_points = source_points * [level_scale_x, level_scale_y]
+    x0, y0, x1, y1 = point_bounds(level_points, level.shape[1], level.shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    
+    # Fold the crop, level scale, rotation and preview scale into the perspective matrix
+    crop_to_image = np.array([
+        [1 / level_scale_x, 0, x0 / level_scale_x],
+        [0, 1 / level_scale_y, y0 / level_scale_y],
+        [0, 0, 1]
+    ])
+    preview_scale = np.diag([scale, scale, 1.0])
+    matrix = preview_scale @ matrix @ orientation @ crop_to_image
+    
+    return cv2.warpPerspective(
+        level[y0:y1, x0:x1], matrix, (preview_width, preview_height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+    )
+
+def order_quad_points(points):
+    """Return the corners of a quad in clockwise order, starting at the corner with the smallest x + y.
+    
+    The corners keep their order around the quad, so a quad turned by about
+    45 degrees still gives four distinct corners.
+    """
+    points = np.float64(points).reshape(4, 2)
+    
+    # Reverse counter-clockwise corners, the signed area is negative for them with y pointing down
+    x, y = points[:, 0], points[:, 1]
+    if np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y) < 0:
+        points = points[::-1]
+    
+    # Start at the top-left corner
+    start = int(np.argmin(points.sum(axis=1)))
+    return np.roll(points, -start, axis=0).tolist()
+
+def hough_lines(edges, min_length):
+    """Return the straight edges of at least min_length pixels as (theta, rho) lines, longest first.
+    
+    A line is the set of points with x cos(theta) + y sin(theta) = rho.
+    Near duplicates of a longer line, e.g. both sides of a thick edge, are
+    left out.
+    """
+    segments = cv2.HoughLinesP(
+        edges, 1, np.pi / 180, int(min_length / 2), minLineLength=int(min_length), maxLineGap=8
+    )
+    if segments is None:
+        return np.empty((0, 2))
+    segments = segments.reshape(-1, 4).astype(np.float64)
+    lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    
+    lines = []
+    for x1, y1, x2, y2 in segments[np.argsort(-lengths)]:
+        theta = np.arctan2(x2 - x1, y1 - y2) % np.pi
+        rho = x1 * np.cos(theta) + y1 * np.sin(theta)
+        if not any(abs(np.sin(theta - t)) < 0.05 and abs(rho - r * np.cos(theta - t)) < 6 for t, r in lines):
+            lines.append((theta, rho))
+    return np.float64(lines).reshape(-1, 2)
+
+def line_intersections(a, b):
+    """Return the intersections of broadcast arrays of (theta, rho) lines as [..., x, y], inf for parallel lines."""
+    det = np.sin(b[..., 0] - a[..., 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (a[..., 1] * np.sin(b[..., 0]) - b[..., 1] * np.sin(a[..., 0])) / det
+        y = (b[..., 1] * np.cos(a[..., 0]) - a[..., 1] * np.cos(b[..., 0])) / det
+    return np.stack([x, y], axis=-1)
+
+@timed('detect_quad')
+def detect_quad(pyramid, full_size=None, proxy_size=512, min_area=0.2, min_coverage=0.5, max_lines=12):
+    """Detect the corners of a document or other quadrilateral on a downscaled proxy.
+    
+    Corners are intersections of straight edges, so occluded or low-contrast
+    corners are still found. Returns four points in full-resolution
+    coordinates, in clockwise order starting at the top-left corner, or None
+    if no convex quadrilateral covering min_area of the image has
+    min_coverage of its outline on edges.
+    """
+    # Use the smallest pyramid level that is still larger than the proxy
+    level = pyramid[0]
+    for candidate in reversed(pyramid):
+        if max(candidate.shape[:2]) >= proxy_size:
+            level = candidate
+            break
+    level_scale_x, level_scale_y = pyramid_level_scale(pyramid, level, full_size)
+    
+    # Downscale the level to the proxy size
+    scale = min(1.0, proxy_size / max(level.shape[:2]))
+    proxy = cv2.resize(level, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = proxy.shape[:2]
+    
+    # Find edges and the straight lines among them
+    gray = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY) if proxy.ndim == 3 else proxy
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(gray, 50, 150)
+    on_edges = cv2.dilate(edges, np.ones((3, 3), np.uint8)) > 0
+    lines = hough_lines(edges, 0.15 * min(width, height))
+    
+    # Split the lines into the longest near-horizontal and near-vertical ones, sorted top to bottom and left to right.
+    # Lines are grouped by their angle to the longest line, so the sides of a quad turned by 45 degrees still split in two
+    if not len(lines):
+        return None
+    is_horizontal = (np.abs(np.cos(lines[:, 0] - lines[0, 0])) > np.sqrt(0.5)) == (np.abs(np.sin(lines[0, 0])) >= np.sqrt(0.5))
+    horizontal = lines[is_horizontal][:max_lines]
+    vertical = lines[~is_horizontal][:max_lines]
+    if len(horizontal) < 2 or len(vertical) < 2:
+        return None
+    horizontal = horizontal[np.argsort((horizontal[:, 1] - np.cos(horizontal[:, 0]) * width / 2) / np.sin(horizontal[:, 0]))]
+    vertical = vertical[np.argsort((vertical[:, 1] - np.sin(vertical[:, 0]) * height / 2) / np.cos(vertical[:, 0]))]
+    
+    # Intersect every top and bottom pair with every left and right pair
+    top, bottom = np.triu_indices(len(horizontal), 1)
+    left, right = np.triu_indices(len(vertical), 1)
+    top, bottom = horizontal[top][:, None], horizontal[bottom][:, None]
+    left, right = vertical[left][None], vertical[right][None]
+    quads = np.stack([
+        line_intersections(top, left), line_intersections(top, right),
+        line_intersections(bottom, right), line_intersections(bottom, left)
+    ], axis=2).reshape(-1, 4, 2)
+    
+    # Keep the convex quadrilaterals that are large enough
+    sides = np.roll(quads, -1, axis=1) - quads
+    turns = sides[:, :, 0] * np.roll(sides, -1, axis=1)[:, :, 1] - sides[:, :, 1] * np.roll(sides, -1, axis=1)[:, :, 0]
+    areas = 0.5 * np.abs(np.sum(quads[:, :, 0] * np.roll(quads, -1, axis=1)[:, :, 1]
+                                - np.roll(quads, -1, axis=1)[:, :, 0] * quads[:, :, 1], axis=1))
+    valid = np.all(turns > 0, axis=1) & (areas >= min_area * width * height)
+    quads, sides, areas = quads[valid], sides[valid], areas[valid]
+    
+    # Measure the fraction of each outline lying on edges
+    steps = np.linspace(0, 1, 64, endpoint=False)[None, None, :, None]
+    samples = np.round(quads[:, :, None] + steps * sides[:, :, None]).astype(np.intp)
+    inside = (samples[..., 0] >= 0) & (samples[..., 0] < width) & (samples[..., 1] >= 0) & (samples[..., 1] < height)
+    coverage = (inside & on_edges[
+        np.clip(samples[..., 1], 0, height - 1), np.clip(samples[..., 0], 0, width - 1)
+    ]).mean(axis=(1, 2))
+    
+    # Prefer large quadrilaterals, but an outline on edges over a larger one that is not
+    scores = np.where(coverage >= min_coverage, areas * coverage ** 2, 0)
+    if not len(scores) or scores.max() == 0:
+        return None
+    
+    # Map the corners back to full-resolution coordinates
+    points = quads[np.argmax(scores)] / [scale * level_scale_x, scale * level_scale_y]
+    return order_quad_points(points)
+
+@timed('detect_corners')
+def detect_corners(pyramid, full_size=None, proxy_size=2048, max_corners=4000):
+    """Detect strong corner features on a pyramid level of about proxy_size pixels.
+    
+    Returns the corners as an N x 2 array in full-resolution coordinates,
+    refined to sub-pixel accuracy on the level they were found on.
+    """
+    # Use the smallest pyramid level that is still larger than the proxy
+    level = pyramid[0]
+    for candidate in reversed(pyramid):
+        if max(candidate.shape[:2]) >= proxy_size:
+            level = candidate
+            break
+    level_scale_x, level_scale_y = pyramid_level_scale(pyramid, level, full_size)
+    
+    # Downscale the level to the proxy size
+    scale = min(1.0, proxy_size / max(level.shape[:2]))
+    proxy = cv2.resize(level, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY) if proxy.ndim == 3 else proxy
+    
+    # Find well separated corners and refine them
+    corners = cv2.goodFeaturesToTrack(gray, max_corners, qualityLevel=0.01, minDistance=4)
+    if corners is None:
+        return np.empty((0, 2))
+    corners = cv2.cornerSubPix(
+        gray, np.float32(corners), (3, 3), (-1, -1),
+        (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.05)
+    )
+    
+    # Map the corners back to full-resolution coordinates
+    return corners.reshape(-1, 2) / [scale * level_scale_x, scale * level_scale_y]
+
+@timed('build_pyramid')
+def build_pyramid(image, min_size=256, overview_size=4096):
+    """Build a mip pyramid of progressively halved copies of the image.
+    
+    Memory-mapped images are first sampled sparsely into an overview level of
+    about overview_size pixels, so only the rows it touches are read.
+    """
+    pyramid = [image]
+    
+    # Sample a memory-mapped image sparsely instead of reading all of it
+    if isinstance(image, np.memmap):
+        step = int(np.ceil(max(image.shape[:2]) / overview_size))
+        if step > 1:
+            pyramid.append(np.ascontiguousarray(image[::step, ::step]))
+    
+    # Halve the last level until it would get smaller than min_size
+    while min(pyramid[-1].shape[:2]) >= 2 * min_size:
+        height, width = pyramid[-1].shape[:2]
+        pyramid.append(cv2.resize(
+            pyramid[-1], (width // 2, height // 2), interpolation=cv2.INTER_AREA
+        ))
+    
+    return pyramid
+
+def pyramid_nbytes(pyramid):
+    """Return the memory held by the pyramid, not counting memory-mapped levels."""
+    return sum(level.nbytes for level in pyramid if not isinstance(level, np.memmap))
+
+def pyramid_level_scale(pyramid, level, full_size=None):
+    """Return the x and y scale of a pyramid level relative to the full-resolution image."""
+    full_width, full_height = full_size or (pyramid[0].shape[1], pyramid[0].shape[0])
+    return level.shape[1] / full_width, level.shape[0] / full_height
+
+def select_pyramid_level(pyramid, scale, full_size=None):
+    """Return the smallest pyramid level with at least the given scale of the full image."""
+    for level in reversed(pyramid):
+        if pyramid_level_scale(pyramid, level, full_size)[0] >= scale:
+            return level
+    return pyramid[0]
+
+def render_region(image, matrix, width, height):
+    """Render a region of an affine view of the image, sampling only the pixels it covers."""
+    matrix = np.array(matrix, dtype=np.float64)
+    src_height, src_width = image.shape[:2]
+    
+    # Find the source rectangle covered by the region, padded for interpolation
+    inverse = cv2.invertAffineTransform(matrix)
+    corners = np.array([[0, 0], [width, 0], [0, height], [width, height]], dtype=np.float64)
+    corners = corners @ inverse[:, :2].T + inverse[:, 2]
+    x0, y0, x1, y1 = point_bounds(corners, src_width, src_height)
+    if x1 <= x0 or y1 <= y0:
+        return np.zeros((height, width) + image.shape[2:], dtype=image.dtype)
+    
+    # Shift the view so it samples from the cropped source
+    matrix[:, 2] += matrix[:, :2] @ [x0, y0]
+    
+    return cv2.warpAffine(
+        image[y0:y1, x0:x1], matrix, (width, height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+    )
+
+def render_pyramid_region(pyramid, zoom, x, y, width, height, full_size=None, rotation=0):
+    """Render a region of the image rotated by rotation clockwise quarter turns and
+    scaled by zoom, from the nearest pyramid level above that scale."""
+    level = select_pyramid_level(pyramid, zoom, full_size)
+    full_width, full_height = full_size or (pyramid[0].shape[1], pyramid[0].shape[0])
+    
+    # Scale the level to full resolution, rotate it and express the zoom relative to it
+    level_scale_x, level_scale_y = pyramid_level_scale(pyramid, level, full_size)
+    matrix = np.array([
+        [zoom, 0, -x],
+        [0, zoom, -y],
+        [0, 0, 1]
+    ]) @ orientation_matrix(rotation, full_width, full_height) @ np.diag([1 / level_scale_x, 1 / level_scale_y, 1])
+    
+    return render_region(level, matrix[:2], width, height)
+
+@timed('load_reduced_image')
+def load_reduced_image(file_path, target_size=1600):
+    """Quickly decode a reduced-resolution JPEG for a first display.
+    
+    Returns the reduced image together with the (width, height) of the full
+    image, or None if the file has no fast reduced decode or is small enough
+    to be loaded in full right away.
+    """
+    if not file_path.lower().endswith(('.jpg', '.jpeg')):
+        return None
+    
+    # Read the full-resolution size from the header without decoding
+    try:
+        with Image.open(file_path) as pil_image:
+            width, height = pil_image.size
+            orientation = pil_image.getexif().get(0x0112, 1)
+    except Exception as e:
+        print(f"Error reading image header: {e}")
+        return None
+    
+    # OpenCV applies the EXIF orientation while decoding
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+    
+    # Use the strongest DCT reduction that still reaches the target size
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                         (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if max(width, height) // factor >= target_size:
+            image = cv2.imread(file_path, flag)
+            if image is None:
+                return None
+            return image, (width, height)
+    
+    return None
+
+def load_image_pyramid(file_path, cancel_event=None, reduced=False):
+    """Load an image and build its display pyramid, giving up early if cancelled.
+    
+    Returns the image, its pyramid and the (width, height) of the full image,
+    or None if cancelled. With reduced set, only a fast reduced-resolution
+    decode is attempted and None is returned if there is none. Otherwise
+    raises LoadError if the image cannot be read.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+    
+    if reduced:
+        result = load_reduced_image(file_path)
+        if result is None:
+            return None
+        image, full_size = result
+    else:
+        image = read_image(file_path)
+        full_size = (image.shape[1], image.shape[0])
+    
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+    
+    return image, build_pyramid(image), full_size
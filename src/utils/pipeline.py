@@ -0,0 +1,191 @@
+"""
+Perspective correction pipeline: load, orient, warp and encode.
+
+This is the engine behind the GUI, the batch command and the HTTP server,
+and it does not import PySide6. Each stage returns a dataclass or raises a
+TransformError subclass:
+
+    from utils.pipeline import EncodeSettings, load, orient, warp, save
+    
+    source = orient(load('scan.jpg'), rotation=1)
+    result = warp(source, [[120, 80], [1910, 95], [1890, 2600], [100, 2580]])
+    save(result, 'page.jpg', EncodeSettings(jpeg_quality=90))
+
+Points are four [x, y] pairs in clockwise order, in pixels of the image as
+oriented. run() chains all stages for a file on disk.
+"""
+import os
+import time
+from dataclasses import asdict, dataclass, field, replace
+
+import cv2
+import numpy as np
+
+from utils.errors import EncodeError, ExportCancelled, InvalidPointsError, LoadError, TransformError
+from utils.image_utils import (
+    encode_params, orientation_matrix, oriented_size, perspective_transform,
+    read_image, warp_perspective_tiled
+)
+from utils.timing_utils import timed
+
+__all__ = [
+    'EncodeSettings', 'SourceImage', 'TransformResult', 'ExportResult',
+    'TransformError', 'LoadError', 'InvalidPointsError', 'EncodeError', 'ExportCancelled',
+    'load', 'decode', 'orient', 'warp', 'encode', 'save', 'export', 'run'
+]
+
+@dataclass(frozen=True)
+class EncodeSettings:
+    """Encoder parameters for saving images. The defaults match OpenCV's own."""
+    jpeg_quality: int = 95
+    png_compression: int = 1
+    progressive: bool = False
+    
+    def params(self, file_path):
+        """Return the cv2.imwrite parameters for the format of file_path."""
+        return encode_params(file_path, **asdict(self))
+
+@dataclass
+class SourceImage:
+    """A BGR image together with the clockwise quarter turns it is viewed with."""
+    image: np.ndarray = field(repr=False)
+    path: str = None
+    rotation: int = 0
+    
+    @property
+    def size(self):
+        """The (width, height) of the image as oriented."""
+        return oriented_size(self.rotation, self.image.shape[1], self.image.shape[0])
+
+@dataclass
+class TransformResult:
+    """A perspective corrected image with the matrix mapping source pixels to it."""
+    image: np.ndarray = field(repr=False)
+    matrix: np.ndarray = field(repr=False)
+    size: tuple
+
+@dataclass
+class ExportResult:
+    """The outcome of writing a perspective corrected image."""
+    output_path: str
+    size: tuple
+    seconds: float
+    input_path: str = None
+
+def load(file_path):
+    """Load an image from file. Raises LoadError if it cannot be read."""
+    return SourceImage(read_image(file_path), path=file_path)
+
+def decode(data, path=None):
+    """Decode an image from encoded bytes. Raises LoadError if they cannot be decoded."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data else None
+    if image is None:
+        raise LoadError(f"{path or 'upload'}: cannot be decoded")
+    return SourceImage(image, path=path)
+
+def orient(source, rotation):
+    """Turn the image by rotation clockwise quarter turns without touching its pixels."""
+    return replace(source, rotation=(source.rotation + rotation) % 4)
+
+def source_matrix(source, points):
+    """Return the matrix mapping source pixels to the output and the output size.
+    
+    Raises InvalidPointsError if the points do not describe a quadrilateral
+    with a non-empty output.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.shape != (4, 2) or not np.isfinite(points).all():
+        raise InvalidPointsError(f"expected 4 [x, y] points, got {points.tolist()}")
+    
+    # Collinear points have sides of non-zero length, but no area to map to the output
+    x, y = points[:, 0], points[:, 1]
+    area = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+    matrix, size = perspective_transform(points)
+    if area < 1 or size[0] < 1 or size[1] < 1 or not np.isfinite(matrix).all():
+        raise InvalidPointsError(f"the points {points.tolist()} enclose no area")
+    
+    # Fold the orientation into the perspective matrix
+    height, width = source.image.shape[:2]
+    return matrix @ orientation_matrix(source.rotation, width, height), size
+
+@timed('warp')
+def warp(source, points, workers=None, progress=None, cancel_event=None, out=None):
+    """Apply the free transformation of the points to the oriented image.
+    
+    The output is warped tile by tile across workers threads into out, if
+    given. Raises InvalidPointsError for bad points and ExportCancelled if
+    cancel_event is set before the warp finished.
+    """
+    matrix, size = source_matrix(source, points)
+    image = warp_perspective_tiled(
+        source.image, matrix, size, workers=workers,
+        progress=progress, cancel_event=cancel_event, out=out
+    )
+    return TransformResult(image, matrix, size)
+
+@timed('encode')
+def encode(result, extension, settings=None):
+    """Encode a result in the format of the file extension and return the bytes."""
+    settings = settings or EncodeSettings()
+    try:
+        ok, buffer = cv2.imencode(extension, result.image, settings.params(extension))
+    except cv2.error as e:
+        raise EncodeError(f"cannot encode {extension}: {e}") from e
+    if not ok:
+        raise EncodeError(f"cannot encode {extension}")
+    return buffer.tobytes()
+
+@timed('save')
+def save(result, file_path, settings=None):
+    """Write a result to file_path in the format of its extension."""
+    settings = settings or EncodeSettings()
+    try:
+        written = cv2.imwrite(file_path, result.image, settings.params(file_path))
+    except cv2.error as e:
+        raise EncodeError(f"{file_path}: {e}") from e
+    if not written:
+        raise EncodeError(f"{file_path}: cannot be written")
+
+def export(source, points, output_path, settings=None, workers=None, progress=None, cancel_event=None):
+    """Warp the oriented image and write it to output_path.
+    
+    NPY outputs are warped straight into a memory-mapped file instead of an
+    in-memory buffer. A cancelled export leaves no partial file behind.
+    """
+    start = time.perf_counter()
+    matrix, (width, height) = source_matrix(source, points)
+    
+    # Stream NPY outputs to disk instead of allocating them in memory
+    out = None
+    if output_path.lower().endswith('.npy'):
+        try:
+            out = np.lib.format.open_memmap(
+                output_path, mode='w+', dtype=source.image.dtype,
+                shape=(height, width) + source.image.shape[2:]
+            )
+        except OSError as e:
+            raise EncodeError(f"{output_path}: {e}") from e
+    
+    try:
+        result = warp(source, points, workers=workers, progress=progress, cancel_event=cancel_event, out=out)
+    except ExportCancelled:
+        if out is not None:
+            del out
+            os.remove(output_path)
+        raise
+    
+    if out is not None:
+        out.flush()
+    else:
+        save(result, output_path, settings)
+    
+    return ExportResult(output_path, result.size, time.perf_counter() - start, input_path=source.path)
+
+def run(input_path, points, output_path, rotation=0, settings=None, workers=None, progress=None, cancel_event=None):
+    """Load, orient, warp and write an image in one call."""
+    start = time.perf_counter()
+    result = export(
+        orient(load(input_path), rotation), points, output_path,
+        settings=settings, workers=workers, progress=progress, cancel_event=cancel_event
+    )
+    return replace(result, seconds=time.perf_counter() - start)
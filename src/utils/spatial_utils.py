@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+class GridIndex:
+    """A uniform grid of points for finding the nearest point within a radius.
+    
+    Queries only look at the cells the radius overlaps, so they take constant
+    time for radii up to about the cell size.
+    """
+
+    def __init__(self, points, cell_size):
+        self.cell_size = cell_size
+        self.points = [(float(x), float(y)) for x, y in points]
+        self._cells = defaultdict(list)
+        for x, y in self.points:
+            self._cells[self._cell(x, y)].append((x, y))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def nearest(self, x, y, radius):
+        """Return the point nearest to (x, y) within radius, or None if there is none."""
+        x0, y0 = self._cell(x - radius, y - radius)
+        x1, y1 = self._cell(x + radius, y + radius)
+        
+        best = None
+        best_distance = radius * radius
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                for point in self._cells.get((cell_x, cell_y), ()):
+                    distance = (point[0] - x) ** 2 + (point[1] - y) ** 2
+                    if distance <= best_distance:
+                        best = point
+                        best_distance = distance
+        return best
@@ -0,0 +1,121 @@
+"""
+Named quad templates for batches of images with identical document placement.
+
+A template stores four points in clockwise order, either normalized to the
+image size or in absolute pixels. Applying a template warps with cv2.remap
+using maps computed once per template and image size.
+"""
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from utils.cache_utils import LRUCache
+from utils.errors import ExportCancelled
+from utils.image_utils import perspective_transform
+from utils.pipeline import ExportResult, SourceImage, TransformResult, load, save, source_matrix
+from utils.timing_utils import timed
+
+TEMPLATES_PATH = os.path.join(os.path.expanduser('~'), '.transform', 'templates.json')
+
+# Remap maps by points, CV_16SC2 maps take 6 bytes per output pixel
+remap_cache = LRUCache(1024 * 1024 * 1024, size_of=lambda maps: maps[0].nbytes + maps[1].nbytes)
+
+def load_templates(path=TEMPLATES_PATH):
+    """Return the templates saved in the template library by name."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as templates_file:
+        return json.load(templates_file)
+
+def save_template(name, points, image_size=None, path=TEMPLATES_PATH):
+    """Save points as a named template, normalized to image_size if it is given."""
+    template = {'points': [[float(x), float(y)] for x, y in points], 'normalized': image_size is not None}
+    if image_size is not None:
+        width, height = image_size
+        template['points'] = [[x / width, y / height] for x, y in template['points']]
+    
+    templates = load_templates(path)
+    templates[name] = template
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as templates_file:
+        json.dump(templates, templates_file, indent=2)
+    return template
+
+def read_template(name_or_path, path=TEMPLATES_PATH):
+    """Return a template from a JSON file or, failing that, from the template library by name."""
+    if os.path.isfile(name_or_path):
+        with open(name_or_path) as template_file:
+            return json.load(template_file)
+    
+    templates = load_templates(path)
+    if name_or_path not in templates:
+        raise KeyError(f"unknown template {name_or_path!r}")
+    return templates[name_or_path]
+
+def template_points(template, width, height):
+    """Return the template points in pixels of a width x height image."""
+    if template.get('normalized'):
+        return [[x * width, y * height] for x, y in template['points']]
+    return [list(point) for point in template['points']]
+
+@timed('template_maps')
+def template_maps(points):
+    """Return the remap maps that apply the free transformation of the points, computing them once.
+    
+    The points determine the output size, so the maps are cached by the
+    points and a batch with fixed geometry only pays for cv2.remap per image.
+    """
+    key = tuple(map(tuple, np.round(np.float64(points), 3).tolist()))
+    maps = remap_cache.get(key)
+    if maps is not None:
+        return maps
+    
+    matrix, (width, height) = perspective_transform(points)
+    
+    # Map every output pixel back to the source
+    grid_x, grid_y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+    grid = np.dstack([grid_x, grid_y])
+    source = cv2.perspectiveTransform(grid.reshape(-1, 1, 2), np.linalg.inv(matrix)).reshape(height, width, 2)
+    
+    # Convert to the compact fixed-point representation cv2.remap is fastest with
+    maps = cv2.convertMaps(source, None, cv2.CV_16SC2)
+    remap_cache.put(key, maps)
+    return maps
+
+def apply_template(image, template):
+    """Apply the free transformation of the template to the image.
+    
+    Raises InvalidPointsError if the template points enclose no area.
+    """
+    height, width = image.shape[:2]
+    points = template_points(template, width, height)
+    
+    # Validate before building the maps, degenerate points have no transformation
+    source_matrix(SourceImage(image), points)
+    map1, map2 = template_maps(points)
+    return cv2.remap(image, map1, map2, cv2.INTER_LINEAR)
+
+def export_template(input_path, template, output_path, settings=None, progress=None, cancel_event=None):
+    """Load an image, apply the template and write the result to output_path.
+    
+    Raises LoadError, InvalidPointsError or EncodeError like pipeline.export,
+    and ExportCancelled if cancel_event is set before the image was loaded.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExportCancelled("Export cancelled")
+    
+    start = time.perf_counter()
+    source = load(input_path)
+    height, width = source.image.shape[:2]
+    points = template_points(template, width, height)
+    matrix, size = source_matrix(source, points)
+    
+    result = TransformResult(apply_template(source.image, template), matrix, size)
+    if progress is not None:
+        progress(1.0)
+    save(result, output_path, settings)
+    return ExportResult(output_path, size, time.perf_counter() - start, input_path=input_path)
@@ -0,0 +1,83 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Set to a file path to record all timed spans as a Chrome trace / Perfetto JSON file
+TRACE_ENV_VAR = 'TRANSFORM_TRACE'
+
+class Timings:
+    """Collect recent operation durations and optionally record them as trace events."""
+
+    def __init__(self, history=200, trace_path=None):
+        self.history = history
+        self.trace_path = trace_path
+        self.durations = {}
+        self.trace_events = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block under the given name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def record(self, name, start, duration):
+        """Record a duration in seconds that started at the given perf_counter time."""
+        with self.lock:
+            if name not in self.durations:
+                self.durations[name] = deque(maxlen=self.history)
+            self.durations[name].append(duration)
+            
+            if self.trace_path:
+                self.trace_events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': (start - self.origin) * 1e6,
+                    'dur': duration * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                })
+
+    def summary(self):
+        """Return (name, latest, p95) in seconds for every recorded operation."""
+        with self.lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+        
+        rows = []
+        for name, values in sorted(durations.items()):
+            ordered = sorted(values)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            rows.append((name, values[-1], p95))
+        return rows
+
+    def write_trace(self, file_path=None):
+        """Write the recorded spans as a Chrome trace JSON file."""
+        file_path = file_path or self.trace_path
+        with self.lock:
+            events = list(self.trace_events)
+        with open(file_path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+
+timings = Timings(trace_path=os.environ.get(TRACE_ENV_VAR))
+
+if timings.trace_path:
+    atexit.register(timings.write_trace)
+
+def timed(name):
+    """Decorate a function so each call is recorded as a span with the given name."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timings.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator